@@ -0,0 +1,204 @@
+"""
+Description: Frame-clock driven animation of many values at once.
+
+Author: Willian T. Lunardi
+Contact: wtlunar@gmail.com
+License: MIT License (https://opensource.org/licenses/MIT)
+
+Repository:
+"""
+
+from typing import Callable, Dict, Optional, Sequence, Union
+
+import numpy as np
+
+Easing = Callable[[np.ndarray], np.ndarray]
+
+
+def linear(t: np.ndarray) -> np.ndarray:
+    return t
+
+
+def ease_in_out(t: np.ndarray) -> np.ndarray:
+    return t * t * (3.0 - 2.0 * t)
+
+
+def ease_out_cubic(t: np.ndarray) -> np.ndarray:
+    return 1.0 - (1.0 - t) ** 3
+
+
+EASINGS: Dict[str, Easing] = {
+    'linear': linear,
+    'ease_in_out': ease_in_out,
+    'ease_out_cubic': ease_out_cubic,
+}
+
+
+class TweenEngine:
+    def __init__(self, size: int, easing: Union[str, Easing] = linear) -> None:
+        """
+        Interpolates a fixed number of values towards their targets, all at once, from the frame time.
+
+        Args:
+            size (int): The number of animated values.
+            easing (Union[str, Easing]): The easing function, or the name of one in EASINGS. It maps the elapsed
+                fraction of every transition, as an array in [0, 1], to the fraction of the distance covered.
+        """
+        self.easing: Easing = EASINGS[easing] if isinstance(easing, str) else easing
+        self.values: np.ndarray = np.zeros(size)
+        self.start_values: np.ndarray = np.zeros(size)
+        self.target_values: np.ndarray = np.zeros(size)
+        self.start_times: np.ndarray = np.zeros(size)
+        self.durations: np.ndarray = np.ones(size)
+        self.end_time: float = 0.0
+        self.now: float = 0.0
+
+    def animate_to(self, targets: Sequence[Optional[float]], duration: float, now: float) -> None:
+        """
+        Starts transitions from the current values to new targets. A transition in progress is replaced by the new
+        one, starting from the value it reached.
+
+        Args:
+            targets (Sequence[Optional[float]]): The new targets. None or NaN leaves the value untouched.
+            duration (float): The duration of the transitions in seconds.
+            now (float): The current frame time in seconds.
+        """
+        self.update(now)
+        targets = np.array([np.nan if target is None else target for target in targets], dtype=float)
+        mask: np.ndarray = ~np.isnan(targets) & (targets != self.target_values)
+        self.start_values[mask] = self.values[mask]
+        self.target_values[mask] = targets[mask]
+        self.start_times[mask] = now
+        self.durations[mask] = max(duration, 1e-6)
+        if mask.any():
+            self.end_time = max(self.end_time, now + duration)
+
+    def update(self, now: float) -> np.ndarray:
+        """
+        Advances every transition to the frame time.
+
+        Args:
+            now (float): The current frame time in seconds.
+
+        Returns:
+            np.ndarray: The current values.
+        """
+        self.now = now
+        if now < self.end_time or not np.array_equal(self.values, self.target_values):
+            t: np.ndarray = np.clip((now - self.start_times) / self.durations, 0.0, 1.0)
+            np.add(self.start_values, (self.target_values - self.start_values) * self.easing(t), out=self.values)
+            np.copyto(self.values, self.target_values, where=t >= 1.0)
+        return self.values
+
+    @property
+    def active(self) -> bool:
+        return self.now < self.end_time
+
+
+class Timeline:
+    __instance = None
+
+    def __init__(self) -> None:
+        """
+        Frame clock shared by the time-based effects of the render loop.
+
+        Effects are pure functions of the time elapsed since they started, so advancing the timeline is a single
+        assignment per frame, whatever the number of running effects. The frame time is read from time.monotonic(), so
+        that effects are not disturbed when the wall clock is adjusted.
+        """
+        self.now: float = 0.0
+        self.end_time: float = 0.0
+
+    @staticmethod
+    def get_instance() -> 'Timeline':
+        """
+        Returns a singleton instance of the timeline.
+
+        Returns:
+            Timeline: The timeline.
+        """
+        if Timeline.__instance is None:
+            Timeline.__instance = Timeline()
+        return Timeline.__instance
+
+    def update(self, now: float) -> None:
+        """
+        Advances the timeline to the frame time.
+
+        Args:
+            now (float): The current frame time in seconds.
+        """
+        self.now = now
+
+    def schedule(self, duration: float) -> float:
+        """
+        Registers an effect starting at the current frame time.
+
+        Args:
+            duration (float): The duration of the effect in seconds.
+
+        Returns:
+            float: The start time of the effect.
+        """
+        self.end_time = max(self.end_time, self.now + duration)
+        return self.now
+
+    @property
+    def active(self) -> bool:
+        return self.now < self.end_time
+
+
+class TimelineEffect:
+    def __init__(self, duration: float) -> None:
+        self.duration: float = duration
+        self.start_time: float = -duration
+        self.timeline: Timeline = Timeline.get_instance()
+
+    def start(self, delay: float = 0.0) -> None:
+        """
+        Starts the effect.
+
+        Args:
+            delay (float): The time before the effect starts in seconds.
+        """
+        self.start_time = self.timeline.schedule(delay + self.duration) + delay
+
+    def stop(self) -> None:
+        self.start_time = -self.duration
+
+    @property
+    def elapsed(self) -> float:
+        return self.timeline.now - self.start_time
+
+    @property
+    def active(self) -> bool:
+        return 0.0 <= self.elapsed < self.duration
+
+    @property
+    def remaining(self) -> float:
+        return max(self.duration - self.elapsed, 0.0)
+
+    @property
+    def progress(self) -> float:
+        return min(max(self.elapsed / self.duration, 0.0), 1.0)
+
+
+class Fade(TimelineEffect):
+    def __init__(self, duration: float = 0.5, fade_in: bool = True) -> None:
+        super().__init__(duration)
+        self.fade_in: bool = fade_in
+
+    @property
+    def alpha(self) -> int:
+        progress: float = self.progress if self.start_time >= 0 else 1.0
+        return int(255 * (progress if self.fade_in else 1.0 - progress))
+
+
+class Highlight(TimelineEffect):
+    def __init__(self, duration: float = 1.0) -> None:
+        super().__init__(duration)
+
+    @property
+    def intensity(self) -> float:
+        return 1.0 - self.progress if self.active else 0.0
+
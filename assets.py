@@ -0,0 +1,139 @@
+"""
+Description: Shared sprite cache, loading every sprite once and keeping pre-scaled variants per target resolution.
+
+Author: Willian T. Lunardi
+Contact: wtlunar@gmail.com
+License: MIT License (https://opensource.org/licenses/MIT)
+
+Repository:
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+import pygame
+
+# Resolution the sprites were drawn for
+REFERENCE_RESOLUTION: Tuple[int, int] = (1250, 1000)
+
+
+class Assets:
+    __instance = None
+
+    def __init__(self, directory: str = 'sprites') -> None:
+        self.directory: str = directory
+        self.scale: float = 1.0
+        self.sprites: Dict[str, pygame.Surface] = {}
+        self.scaled_sprites: Dict[Tuple[str, float], pygame.Surface] = {}
+        self.decoded: Dict[str, pygame.Surface] = {}
+        self.prefetcher: Optional[threading.Thread] = None
+        self.prefetch_time: float = 0.0
+
+    @staticmethod
+    def get_instance() -> 'Assets':
+        """
+        Returns a singleton instance of the sprite cache.
+
+        Returns:
+            Assets: The sprite cache.
+        """
+        if Assets.__instance is None:
+            Assets.__instance = Assets()
+        return Assets.__instance
+
+    def set_resolution(self, width: int, height: int) -> None:
+        """
+        Sets the default scale of the sprites from the screen resolution.
+
+        Args:
+            width (int): The screen width in pixels.
+            height (int): The screen height in pixels.
+        """
+        self.scale = min(width / REFERENCE_RESOLUTION[0], height / REFERENCE_RESOLUTION[1])
+
+    def load(self, name: str) -> pygame.Surface:
+        """
+        Returns a sprite at its original size, loading it from disk the first time it is requested.
+
+        Args:
+            name (str): The file name of the sprite, without the extension.
+
+        Returns:
+            pygame.Surface: The sprite. It is shared, so it must not be modified.
+        """
+        sprite: Optional[pygame.Surface] = self.sprites.get(name)
+        if sprite is None:
+            self.wait()
+            decoded: Optional[pygame.Surface] = self.decoded.pop(name, None)
+            if decoded is None:
+                decoded = pygame.image.load(os.path.join(self.directory, f'{name}.png'))
+            sprite = decoded.convert_alpha()
+            self.sprites[name] = sprite
+        return sprite
+
+    def prefetch(self, names: Optional[Iterable[str]] = None) -> None:
+        """
+        Reads and decodes sprites on a background thread, e.g. while the window is being set up. Converting them to
+        the pixel format of the screen is left to their first use, as it needs the display mode to be set.
+
+        Args:
+            names (Optional[Iterable[str]]): The file names of the sprites, without the extension. Defaults to all
+                sprites of the directory.
+        """
+        if names is None:
+            names = [os.path.splitext(file)[0] for file in os.listdir(self.directory) if file.endswith('.png')]
+        names = list(names)
+
+        def decode() -> None:
+            start: float = time.perf_counter()
+            for name in names:
+                self.decoded[name] = pygame.image.load(os.path.join(self.directory, f'{name}.png'))
+            self.prefetch_time = time.perf_counter() - start
+
+        self.prefetcher = threading.Thread(target=decode, daemon=True)
+        self.prefetcher.start()
+
+    def wait(self) -> None:
+        """
+        Waits for the sprites being prefetched, if any.
+        """
+        if self.prefetcher is not None:
+            self.prefetcher.join()
+            self.prefetcher = None
+
+    def get(self, name: str, scale: Optional[float] = None) -> pygame.Surface:
+        """
+        Returns a sprite scaled for the target resolution, scaling it the first time it is requested.
+
+        Args:
+            name (str): The file name of the sprite, without the extension.
+            scale (Optional[float]): The scale of the sprite. Defaults to the scale of the current resolution.
+
+        Returns:
+            pygame.Surface: The scaled sprite. It is shared, so it must not be modified.
+        """
+        scale = round(self.scale if scale is None else scale, 3)
+        if scale == 1.0:
+            return self.load(name)
+
+        key = (name, scale)
+        sprite: Optional[pygame.Surface] = self.scaled_sprites.get(key)
+        if sprite is None:
+            original: pygame.Surface = self.load(name)
+            size = (max(1, round(original.get_width() * scale)), max(1, round(original.get_height() * scale)))
+            sprite = pygame.transform.smoothscale(original, size)
+            self.scaled_sprites[key] = sprite
+        return sprite
+
+    def preload(self, names: Iterable[str], scale: Optional[float] = None) -> None:
+        """
+        Loads and scales sprites ahead of their first use.
+
+        Args:
+            names (Iterable[str]): The file names of the sprites, without the extension.
+            scale (Optional[float]): The scale of the sprites. Defaults to the scale of the current resolution.
+        """
+        for name in names:
+            self.get(name, scale)
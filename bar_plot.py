@@ -9,36 +9,44 @@ Repository:
 """
 
 import random
-import threading
 import time
-from typing import List
+from typing import List, Optional, Tuple
 
 import numpy as np
 import pygame
 
+from animation import TweenEngine
+from assets import Assets
 from text import Text
 
+BAR_SPRITES: List[str] = ['bar_red', 'bar_green', 'bar_green_active', 'bar_shadow2']
+
 
 class Bar:
-    def __init__(self, x: int, y: int, ch: int) -> None:
+    def __init__(self, x: int, y: int, ch: int, scale: Optional[float] = None) -> None:
         self.x: int = x
         self.y: int = y
         self.ch = ch
-        self.red_sprite: pygame.Surface = pygame.image.load(f'sprites/bar_red.png').convert_alpha()
-        self.green_sprite: pygame.Surface = pygame.image.load(f'sprites/bar_green.png').convert_alpha()
-        self.current_ch_sprite: pygame.Surface = pygame.image.load(f'sprites/bar_green_active.png').convert_alpha()
-        self.shadow: pygame.Surface = pygame.image.load(f'sprites/bar_shadow2.png').convert_alpha()
+        assets: Assets = Assets.get_instance()
+        self.red_sprite: pygame.Surface = assets.get('bar_red', scale)
+        self.green_sprite: pygame.Surface = assets.get('bar_green', scale)
+        self.current_ch_sprite: pygame.Surface = assets.get('bar_green_active', scale)
+        self.shadow: pygame.Surface = assets.get('bar_shadow2', scale)
         self.sprite: pygame.Surface = self.green_sprite
         self.rect: pygame.Rect = self.sprite.get_rect()
         self.ch_numb: Text = Text(ch, (x + self.rect.width // 2, self.y - 12), orientation='horizontal')
         self.value: float = 0.0
-        self.target_value: float = 0.0
 
-    def draw(self, surface: pygame.Surface, current_channel: int) -> None:
+        self.column: pygame.Rect = pygame.Rect(x, 0, self.rect.width + self.shadow.get_width(), y)
+        self.drawn_state: Optional[Tuple[pygame.Surface, int]] = None
+
+    def select_sprite(self, current_channel: int) -> pygame.Surface:
         if self.ch == current_channel:
-            self.sprite = self.current_ch_sprite
-        else:
-            self.sprite = self.red_sprite if self.value < 0.5 else self.green_sprite
+            return self.current_ch_sprite
+        return self.red_sprite if self.value < 0.5 else self.green_sprite
+
+    def draw(self, surface: pygame.Surface, current_channel: int) -> None:
+        self.sprite = self.select_sprite(current_channel)
         self.rect = self.sprite.get_rect()
 
         # pygame.draw.circle(surface, (0, 255, 0), (self.x, self.y), 10)
@@ -53,39 +61,49 @@ class Bar:
         if ticks:
             pygame.draw.line(surface, (0, 0, 0), (self.x + self.rect.width // 2, self.y - 2), (self.x + self.rect.width // 2, self.y + 2))  # y line
 
-    def transition_to_target_value(self, duration: float) -> None:
-        if self.value == self.target_value:
-            return
-
-        start_value: float = self.value
-        start_time: float = time.time()
-        end_time: float = start_time + duration
-
-        def run() -> None:
-            while time.time() < end_time:
-                t: float = (time.time() - start_time) / duration
-                self.value = start_value + t * (self.target_value - start_value)
-                time.sleep(0.01)
+    def redraw(self, surface: pygame.Surface, background: pygame.Surface, font: pygame.font.Font, current_channel: int, force: bool = False) -> List[pygame.Rect]:
+        """
+        Draws the bar again if its sprite or height changed since it was last drawn. Its column is restored from the
+        background first, and the channel number drawn over the bar is drawn again on top.
 
-            self.value = self.target_value
+        Returns:
+            List[pygame.Rect]: The rectangles of the surface that changed.
+        """
+        state: Tuple[pygame.Surface, int] = (self.select_sprite(current_channel), int(self.rect.height * (1 - self.value)))
+        if not force and state == self.drawn_state:
+            return []
 
-        thread: threading.Thread = threading.Thread(target=run)
-        thread.start()
+        self.drawn_state = state
+        clip: pygame.Rect = surface.get_clip()
+        surface.set_clip(self.column)
+        surface.blit(background, self.column, self.column)
+        self.draw(surface, current_channel)
+        self.draw_ch_numb(surface, font)
+        surface.set_clip(clip)
+        return [self.column]
 
 
 class BarPlot:
-    def __init__(self, x: int, y: int, width: int, height: int, x_axis: List[int], bar_width: int = 62, bottom_spacing: int = 50, side_spacing: int = 50, x_title: str = '',
-                 y_title: str = '') -> None:
+    def __init__(self, x: int, y: int, width: int, height: int, x_axis: List[int], bar_width: Optional[int] = None, bottom_spacing: int = 50, side_spacing: int = 50,
+                 x_title: str = '', y_title: str = '', easing: str = 'linear') -> None:
         self.x: int = x
         self.y: int = y
         self.width: int = width
         self.height: int = height
         self.num_bars: int = len(x_axis)
+
+        # Bar sprites are scaled to the bar width, which defaults to the sprite width at the current resolution
+        assets: Assets = Assets.get_instance()
+        scale: float = assets.scale if bar_width is None else bar_width / assets.load('bar_red').get_width()
+        assets.preload(BAR_SPRITES, scale)
+        bar_width = assets.get('bar_red', scale).get_width()
+
         self.bar_width: int = bar_width
         self.bar_spacing: int = (width - side_spacing - bar_width * self.num_bars) // self.num_bars
         self.bottom_spacing: int = bottom_spacing
         self.side_spacing: int = side_spacing
         self.bars: List[Bar] = []
+        self.tweens: TweenEngine = TweenEngine(self.num_bars, easing)
 
         self.x_text: Text = Text(x_title, (x + self.width // 2, self.y + self.height - (self.bottom_spacing // 2)), orientation='horizontal')
         self.y_text: Text = Text(y_title, (x + self.side_spacing // 2, y + self.height // 2), orientation='vertical')
@@ -94,32 +112,43 @@ class BarPlot:
         for i in range(self.num_bars):
             bar_x: int = self.x + pad + self.side_spacing + i * (self.bar_spacing + bar_width)
             bar_y: int = self.y + height - self.bottom_spacing
-            bar: Bar = Bar(bar_x, bar_y, ch=x_axis[i])
+            bar: Bar = Bar(bar_x, bar_y, ch=x_axis[i], scale=scale)
+            # Bars are clipped to the plot area, inside the axes and the plot border
+            bar.column = bar.column.clip(pygame.Rect(self.x + self.side_spacing + 1, self.y + 1, self.width - self.side_spacing - 2, bar_y - self.y - 1))
             self.bars.append(bar)
 
         # Temporary
-        self.last_update: float = time.time()
-        self.update_bar_values(np.linspace(0.0, 1, self.num_bars))
+        self.last_update: float = time.monotonic()
+        self.update_bar_values(np.linspace(0.0, 1, self.num_bars), now=self.last_update)
 
-    def update_bar_values(self, values: np.ndarray, transition_duration: float = 1.0) -> None:
+    def update_bar_values(self, values: np.ndarray, transition_duration: float = 1.0, now: Optional[float] = None) -> None:
         min_value, max_value = 0.1, 1.0
         value_range = max_value - min_value
-        for i, bar in enumerate(self.bars):
-            if values[i] is not None:
-                bar.target_value = min_value + (values[i] * value_range)
-                bar.transition_to_target_value(transition_duration)
+        targets: List[Optional[float]] = [None if value is None else min_value + (value * value_range) for value in values]
+        self.tweens.animate_to(targets, transition_duration, time.monotonic() if now is None else now)
 
-    def draw(self, surface: pygame.Surface, font: pygame.font.Font, values: np.ndarray, current_channel: int) -> None:
+    def update(self, values: np.ndarray, now: Optional[float] = None) -> np.ndarray:
+        now = time.monotonic() if now is None else now
         new_values_interval_sec: int = 2
-        if time.time() - new_values_interval_sec > self.last_update:
+        if now - new_values_interval_sec > self.last_update:
             index: int = random.randint(0, self.num_bars - 1)
             # values: np.ndarray = generate_smooth_distribution(self.num_bars, index)
-            self.update_bar_values(values)
-            self.last_update: float = time.time()
+            self.update_bar_values(values, now=now)
+            self.last_update: float = now
 
+        bar_values: np.ndarray = self.tweens.update(now)
+        for i, bar in enumerate(self.bars):
+            bar.value = bar_values[i]
+        return bar_values
+
+    def draw(self, surface: pygame.Surface, font: pygame.font.Font, values: np.ndarray, current_channel: int, now: Optional[float] = None) -> None:
+        self.update(values, now)
         for i, bar in enumerate(self.bars):
             bar.draw(surface, current_channel)
 
+        self.draw_static(surface, font)
+
+    def draw_static(self, surface: pygame.Surface, font: pygame.font.Font) -> None:
         # Draw bottom and side rectangle
         pygame.draw.rect(surface, (255, 255, 255), (self.x, self.y + self.height - self.bottom_spacing, self.width, self.bottom_spacing), 0)  # x axis
         pygame.draw.line(surface, (0, 0, 0), (self.x, self.y + self.height - self.bottom_spacing), (self.x + self.width, self.y + self.height - self.bottom_spacing))  # x line
@@ -135,3 +164,18 @@ class BarPlot:
 
         # pygame.draw.circle(surface, (255, 0, 0), (self.x, self.y), 10)
         pygame.draw.rect(surface, (0, 0, 0), (self.x, self.y, self.width, self.height), 1)
+
+    def redraw(self, surface: pygame.Surface, background: pygame.Surface, font: pygame.font.Font, values: np.ndarray, current_channel: int, now: Optional[float] = None,
+               force: bool = False) -> List[pygame.Rect]:
+        """
+        Draws the bars whose sprite or height changed since they were last drawn, over the static layer drawn by
+        draw_static.
+
+        Returns:
+            List[pygame.Rect]: The rectangles of the surface that changed.
+        """
+        self.update(values, now)
+        rects: List[pygame.Rect] = []
+        for bar in self.bars:
+            rects.extend(bar.redraw(surface, background, font, current_channel, force))
+        return rects
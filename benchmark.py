@@ -0,0 +1,135 @@
+"""
+Description: Headless render benchmark, replaying a scripted stream of channel switches and quality estimations.
+
+Author: Willian T. Lunardi
+Contact: wtlunar@gmail.com
+License: MIT License (https://opensource.org/licenses/MIT)
+
+Repository:
+"""
+
+import json
+import logging
+import os
+import time
+from typing import Dict, List
+
+import numpy as np
+import pygame
+
+from animation import Timeline
+from assets import Assets
+from dashboard import Dashboard
+from data_source import Snapshot
+from options import Options
+from text import Text, TextCache
+from util import Screen, Font, quit_pygame
+
+
+class ScriptedDataSource:
+    def __init__(self, channels: List[int], seed: int = 0, nodes: int = 3, switch_every: int = 120, estimate_every: int = 30) -> None:
+        """
+        Deterministic stand-in for the DataSource, publishing a new quality vector every estimate_every frames and
+        moving a random tenth of the nodes, at least one, to the best channel every switch_every frames.
+
+        Args:
+            channels (List[int]): The channels of the plot.
+            seed (int): The seed of the random generator.
+            nodes (int): The number of mesh nodes.
+            switch_every (int): The number of frames between channel switches.
+            estimate_every (int): The number of frames between quality estimations.
+        """
+        self.channels: List[int] = channels
+        self.rng: np.random.Generator = np.random.default_rng(seed)
+        self.switch_every: int = switch_every
+        self.estimate_every: int = estimate_every
+        self.quality: np.ndarray = self.rng.random(len(channels))
+        self.node_channels: np.ndarray = self.rng.choice(channels, nodes)
+        self.snapshot: Snapshot = Snapshot(0, (), ())
+
+    def step(self, frame: int) -> Snapshot:
+        node_channels = self.snapshot.node_channels
+        channel_quality = self.snapshot.channel_quality
+        changed: bool = False
+
+        if frame % self.estimate_every == 0:
+            self.quality = self.rng.random(len(self.channels))
+            channel_quality = tuple(zip(self.channels, self.quality.tolist()))
+            changed = True
+
+        if frame % self.switch_every == 0:
+            moving: np.ndarray = self.rng.choice(len(self.node_channels), max(1, len(self.node_channels) // 10), replace=False)
+            self.node_channels[moving] = self.channels[int(np.argmax(self.quality))]
+            node_channels = tuple(enumerate(self.node_channels.tolist(), start=1))
+            changed = True
+
+        if changed:
+            self.snapshot = Snapshot(self.snapshot.version + 1, node_channels, channel_quality)
+        return self.snapshot
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    values: np.ndarray = np.asarray(samples) * 1000
+    return {
+        'mean_ms': float(np.mean(values)),
+        'p50_ms': float(np.percentile(values, 50)),
+        'p95_ms': float(np.percentile(values, 95)),
+        'p99_ms': float(np.percentile(values, 99)),
+    }
+
+
+def run_benchmark(args: Options) -> Dict[str, Dict[str, float]]:
+    """
+    Renders args.benchmark_frames frames of a scripted scenario with SDL's dummy video driver, on a simulated 60 Hz
+    frame clock so that runs are reproducible, and reports frame time percentiles per component.
+
+    Args:
+        args (Options): The parsed options.
+
+    Returns:
+        Dict[str, Dict[str, float]]: The frame time statistics, per component and for the whole frame.
+    """
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    pygame.init()
+
+    screen: pygame.Surface = Screen.get_instance(args)
+    font: pygame.font.Font = Font.get_instance(24)
+    Assets.get_instance().set_resolution(args.screen_width, args.screen_height)
+    dashboard: Dashboard = Dashboard(args, screen, font)
+    data_source: ScriptedDataSource = ScriptedDataSource(dashboard.channels, args.benchmark_seed, args.benchmark_nodes)
+
+    samples: Dict[str, List[float]] = {'frame': [], 'data': [], 'text': []}
+    start_time: float = time.monotonic()
+    start_timestamp: float = time.time()
+    for frame in range(args.benchmark_frames):
+        now: float = start_time + frame / 60
+        Timeline.get_instance().update(now)
+        pygame.event.pump()
+
+        frame_start: float = time.perf_counter()
+        text_start: float = Text.draw_time
+        dashboard.apply_snapshot(data_source.step(frame), start_timestamp + frame / 60)
+        data_done: float = time.perf_counter()
+        dashboard.render(now)
+        frame_end: float = time.perf_counter()
+
+        samples['frame'].append(frame_end - frame_start)
+        samples['data'].append(data_done - frame_start)
+        samples['text'].append(Text.draw_time - text_start)
+        for component, duration in dashboard.timings.items():
+            samples.setdefault(component, []).append(duration)
+
+    report: Dict[str, Dict[str, float]] = {component: summarize(values) for component, values in samples.items()}
+    quit_pygame()
+
+    print(f"{'component':>12} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for component, stats in report.items():
+        print(f"{component:>12} {stats['mean_ms']:>9.3f} {stats['p50_ms']:>9.3f} {stats['p95_ms']:>9.3f} {stats['p99_ms']:>9.3f}")
+    logging.info("Text cache: %s", TextCache.get_instance().stats())
+    logging.info("Renderer: %s", dashboard.renderer.stats())
+
+    if args.benchmark_output:
+        with open(args.benchmark_output, 'w') as f:
+            json.dump({'frames': args.benchmark_frames, 'seed': args.benchmark_seed, 'nodes': args.benchmark_nodes, 'report': report}, f, indent=2)
+    return report
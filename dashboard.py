@@ -0,0 +1,167 @@
+"""
+Description: The dashboard scene, with the mesh nodes, the jammer and the channel quality plot.
+
+Author: Willian T. Lunardi
+Contact: wtlunar@gmail.com
+License: MIT License (https://opensource.org/licenses/MIT)
+
+Repository:
+"""
+
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+import pygame
+
+from animation import Timeline
+from bar_plot import BarPlot
+from data_source import Snapshot
+from history import QualityHistory
+from node import Node
+from options import Options
+from renderer import Renderer
+from topology import TopologyView
+from waterfall import Waterfall
+from util import Colors
+
+CHANNELS: List[int] = [36, 40, 44, 48, 52, 56, 60, 64, 149, 153, 157, 161, 165]
+
+# Layout of the bottom half of the screen when the waterfall is shown next to the bar plot: the share of the screen
+# width kept by the bar plot, the space left of the bars for the y axis title, and the share of the space of every
+# channel covered by its bar, the rest separating it from its neighbours
+WATERFALL_PLOT_SHARE: float = 0.6
+PLOT_SIDE_SPACING: int = 50
+WATERFALL_BAR_FILL: float = 0.67
+
+
+class Dashboard:
+    def __init__(self, args: Options, screen: pygame.Surface, font: pygame.font.Font) -> None:
+        self.args: Options = args
+        self.screen: pygame.Surface = screen
+        self.font: pygame.font.Font = font
+
+        # Create the topology view, filled from the database, and the jammer
+        self.topology: TopologyView = TopologyView(pygame.Rect(0, 0, args.screen_width, args.top_height // 2), font, max_spacing=args.node_spacing)
+        self.jammer: Node = Node('Jammer', None, (args.screen_size[0] // 2, 3 * args.top_height // 4))
+
+        # Create the bar plot, sharing the bottom half of the screen with the waterfall if enabled
+        self.channels: List[int] = CHANNELS
+        plot_width: int = args.screen_width if not args.waterfall else int(args.screen_width * WATERFALL_PLOT_SHARE)
+        plot_height: int = args.screen_height // 2
+        self.bar_plot: BarPlot = BarPlot(
+            x=0,
+            y=args.screen_size[1] - plot_height,
+            width=plot_width,
+            height=plot_height,
+            x_axis=self.channels,
+            bar_width=None if not args.waterfall else int(WATERFALL_BAR_FILL * (plot_width - PLOT_SIDE_SPACING) / len(self.channels)),
+            side_spacing=PLOT_SIDE_SPACING,
+            x_title='5GHz Channels',
+            y_title='Estimated Channel Quality'
+        )
+
+        self.waterfall: Optional[Waterfall] = None
+        if args.waterfall:
+            margin: int = 20
+            waterfall_rect: pygame.Rect = pygame.Rect(plot_width + margin, args.screen_height - plot_height + margin, args.screen_width - plot_width - 2 * margin,
+                                                      plot_height - self.bar_plot.bottom_spacing - margin)
+            self.waterfall = Waterfall(waterfall_rect, len(self.channels), title='Channel Quality History')
+
+        self.renderer: Renderer = Renderer(screen, self.draw_background)
+        self.snapshot_version: int = -1
+        self.current_channel: int = -1
+        self.history: QualityHistory = QualityHistory(self.channels)
+        self.channel_quality: tuple = ()
+        self.values: np.ndarray = self.history.latest
+        self.timings: Dict[str, float] = {}
+
+    def draw_background(self, surface: pygame.Surface) -> None:
+        """
+        Draws the static parts of the screen once into the background layer.
+        """
+        surface.fill(Colors.WHITE.value)
+
+        # Add border around whole screen
+        pygame.draw.rect(surface, (0, 0, 0), (0, 0, self.args.screen_width, self.args.screen_height), 1)
+
+        # Draw mesh nodes and jammer
+        self.topology.draw_static(surface)
+        self.jammer.draw_static(surface, self.font)
+
+        # Draw plot axes, ticks and titles
+        self.bar_plot.draw_static(surface, self.font)
+        if self.waterfall is not None:
+            self.waterfall.draw_static(surface, self.font)
+
+    def apply_snapshot(self, snapshot: Snapshot, timestamp: Optional[float] = None) -> bool:
+        """
+        Picks up the latest snapshot of the database, if it changed.
+
+        Args:
+            snapshot (Snapshot): The latest snapshot.
+            timestamp (Optional[float]): The wall clock time of a new estimation in seconds, now by default.
+
+        Returns:
+            bool: Whether the snapshot changed since the previous call.
+        """
+        if snapshot.version == self.snapshot_version:
+            return False
+
+        self.snapshot_version = snapshot.version
+
+        # Record new estimations in the history, channels without estimation are NaN
+        if snapshot.channel_quality != self.channel_quality:
+            self.channel_quality = snapshot.channel_quality
+            self.values = self.history.append(snapshot.channel_quality, time.time() if timestamp is None else timestamp)
+            if self.waterfall is not None:
+                self.waterfall.push(self.values)
+
+        # Move the nodes whose channel changed, and lay the mesh out again if nodes joined or left
+        if self.topology.apply(snapshot.node_channels):
+            self.renderer.invalidate()
+
+        latest_channel: Optional[int] = snapshot.latest_channel
+        if latest_channel is not None:
+            self.current_channel = latest_channel
+        return True
+
+    def render(self, now: float) -> List[pygame.Rect]:
+        """
+        Renders a frame, only redrawing what changed on top of the background layer.
+
+        Args:
+            now (float): The current frame time in seconds.
+
+        Returns:
+            List[pygame.Rect]: The rectangles pushed to the display.
+        """
+        start: float = time.perf_counter()
+        force: bool = self.renderer.begin_frame()
+        rects: List[pygame.Rect] = []
+        background_done: float = time.perf_counter()
+
+        # Draw mesh nodes channel
+        rects.extend(self.topology.redraw(self.screen, self.renderer.background, force))
+        nodes_done: float = time.perf_counter()
+
+        # Draw plot with the latest quality estimation values
+        rects.extend(self.bar_plot.redraw(self.screen, self.renderer.background, self.font, self.values, self.current_channel, now, force))
+        plot_done: float = time.perf_counter()
+
+        # Scroll the new estimations into the waterfall
+        if self.waterfall is not None:
+            rects.extend(self.waterfall.redraw(self.screen, force))
+        waterfall_done: float = time.perf_counter()
+
+        # Update the display
+        self.renderer.end_frame(rects)
+        end: float = time.perf_counter()
+
+        self.timings = {'background': background_done - start, 'nodes': nodes_done - background_done, 'bar_plot': plot_done - nodes_done, 'waterfall': waterfall_done - plot_done,
+                        'display': end - waterfall_done}
+        return rects
+
+    @property
+    def active(self) -> bool:
+        return self.bar_plot.tweens.active or Timeline.get_instance().active
@@ -0,0 +1,234 @@
+"""
+Description: Background polling of the demo database, or reading of the shared memory segment published by the server,
+handing immutable snapshots to the render loop.
+
+Author: Willian T. Lunardi
+Contact: wtlunar@gmail.com
+License: MIT License (https://opensource.org/licenses/MIT)
+
+Repository:
+"""
+
+import logging
+import sqlite3
+import threading
+from typing import Any, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+# Layout of the segment, see server/shared_state.py
+SHARED_MEMORY_MAGIC: int = int.from_bytes(b'JAMSHM01', 'little')
+HEADER_FIELDS: int = 8
+SEQUENCE, MAX_NODES, MAX_CHANNELS, NODE_COUNT, CHANNEL_COUNT, GENERATION = range(1, 7)
+
+
+class Snapshot(NamedTuple):
+    version: int
+    node_channels: Tuple[Tuple[int, int], ...]
+    channel_quality: Tuple[Tuple[int, float], ...]
+
+    @property
+    def latest_channel(self) -> Optional[int]:
+        return int(self.node_channels[0][1]) if self.node_channels else None
+
+
+class DataSource(threading.Thread):
+    def __init__(self, database: str = 'server/demo.db', interval: float = 0.05) -> None:
+        """
+        Polls the database on a background thread and re-reads the tables only when they changed.
+
+        Changes are detected with PRAGMA data_version, which is bumped whenever another connection commits to the
+        database, so polling an unchanged database costs no table scan. Every re-read is published as a new immutable
+        Snapshot, which the render loop picks up without doing any I/O.
+
+        Args:
+            database (str): The path of the SQLite database.
+            interval (float): The polling interval in seconds.
+        """
+        threading.Thread.__init__(self, daemon=True)
+        self.database: str = database
+        self.interval: float = interval
+        self.snapshot: Snapshot = Snapshot(0, (), ())
+        self.stopped: threading.Event = threading.Event()
+
+    def run(self) -> None:
+        conn = sqlite3.connect(self.database)
+        data_version: Optional[int] = None
+        try:
+            while not self.stopped.is_set():
+                try:
+                    current_version: int = conn.execute("PRAGMA data_version").fetchone()[0]
+                    if current_version != data_version:
+                        self.snapshot = self.read(conn)
+                        data_version = current_version
+                except sqlite3.Error:
+                    logging.error("Database connection error", exc_info=True)
+                self.stopped.wait(self.interval)
+        finally:
+            conn.close()
+
+    def read(self, conn: sqlite3.Connection) -> Snapshot:
+        with conn:
+            conn.execute("BEGIN")
+            node_channels = tuple(conn.execute("SELECT * FROM node_channels").fetchall())
+            channel_quality = tuple(conn.execute("SELECT * FROM channel_quality").fetchall())
+        return Snapshot(self.snapshot.version + 1, node_channels, channel_quality)
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.join()
+
+
+class SharedMemoryDataSource(threading.Thread):
+    def __init__(self, name: str = 'jamui', interval: float = 0.5, retries: int = 3) -> None:
+        """
+        Reads the state published by the server to a shared memory segment, in place of the database.
+
+        The background thread attaches to the segment, waiting for the server to create it, and attaches again when
+        the server closes it or is restarted with a new one, told apart by the generation in its header. Reading the
+        snapshot checks the magic and the sequence of
+        the segment's seqlock, plain memory reads, and copies the arrays only when the sequence changed, so the render
+        loop makes no system call per frame.
+
+        Args:
+            name (str): The name of the segment.
+            interval (float): The interval between checks of the segment in seconds.
+            retries (int): The number of copies attempted when the server writes during a copy, the previous
+                snapshot is kept until the next frame after that.
+        """
+        threading.Thread.__init__(self, daemon=True)
+        self.name: str = name
+        self.interval: float = interval
+        self.retries: int = retries
+        # The segment, its header and its arrays, replaced as a whole so that the render loop sees a consistent set
+        self.mapping: Optional[Tuple[Any, np.ndarray, Tuple[np.ndarray, ...]]] = None
+        self.retired: List[Any] = []
+        self.sequence: int = -1
+        self.latest: Snapshot = Snapshot(0, (), ())
+        self.stopped: threading.Event = threading.Event()
+
+    def run(self) -> None:
+        while not self.stopped.is_set():
+            self.close_retired()
+            mapping = self.mapping
+            if mapping is not None and int(mapping[1][0]) != SHARED_MEMORY_MAGIC:
+                logging.warning("Shared memory segment %s was closed by the server, attaching again", self.name)
+                self.detach()
+            elif mapping is not None and self.current_generation() not in (None, int(mapping[1][GENERATION])):
+                # A server that did not exit cleanly left the segment mapped here open, its successor created a new one
+                logging.warning("Shared memory segment %s was replaced by a new server, attaching again", self.name)
+                self.detach()
+            if self.mapping is None:
+                try:
+                    self.attach()
+                except FileNotFoundError:
+                    pass
+            self.stopped.wait(self.interval)
+
+    def open_segment(self) -> Any:
+        """
+        Opens the segment currently published under the name.
+
+        Returns:
+            SharedMemory: The segment. Raises FileNotFoundError if there is none.
+        """
+        # Imported here, only the shared memory transport needs multiprocessing
+        from multiprocessing import shared_memory
+
+        try:
+            return shared_memory.SharedMemory(self.name, track=False)
+        except TypeError:
+            # Before Python 3.13, the resource tracker removes attached segments when the process exits
+            memory = shared_memory.SharedMemory(self.name)
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(memory._name, 'shared_memory')
+            return memory
+
+    def current_generation(self) -> Optional[int]:
+        """
+        Reads the generation of the segment currently published under the name.
+
+        Returns:
+            Optional[int]: The generation, None if there is no segment or it is not ready.
+        """
+        try:
+            memory = self.open_segment()
+        except FileNotFoundError:
+            return None
+        header = np.ndarray((HEADER_FIELDS,), np.int64, memory.buf)
+        generation: Optional[int] = int(header[GENERATION]) if int(header[0]) == SHARED_MEMORY_MAGIC else None
+        del header
+        memory.close()
+        return generation
+
+    def attach(self) -> None:
+        """
+        Attaches to the segment, unless the server did not finish creating it yet.
+        """
+        memory = self.open_segment()
+        header = np.ndarray((HEADER_FIELDS,), np.int64, memory.buf)
+        magic: int = int(header[0])
+        if magic != SHARED_MEMORY_MAGIC:
+            # Zero while the server is still creating the segment or after it closed it, retried at the next check
+            if magic != 0:
+                logging.warning("Unexpected magic %#x in shared memory segment %s", magic, self.name)
+            del header
+            memory.close()
+            return
+        max_nodes, max_channels = int(header[MAX_NODES]), int(header[MAX_CHANNELS])
+        offset = 8 * HEADER_FIELDS
+        arrays = (
+            np.ndarray((max_nodes,), np.int64, memory.buf, offset),
+            np.ndarray((max_nodes,), np.int64, memory.buf, offset + 8 * max_nodes),
+            np.ndarray((max_channels,), np.int64, memory.buf, offset + 16 * max_nodes),
+            np.ndarray((max_channels,), np.float64, memory.buf, offset + 16 * max_nodes + 8 * max_channels),
+        )
+        self.sequence = -1
+        self.mapping = (memory, header, arrays)
+        logging.info("Reading state from shared memory segment %s", self.name)
+
+    def detach(self) -> None:
+        """
+        Drops the mapping. The segment is closed at the next check, once the render loop no longer reads it.
+        """
+        mapping = self.mapping
+        self.mapping = None
+        if mapping is not None:
+            self.retired.append(mapping[0])
+
+    def close_retired(self) -> None:
+        retired, self.retired = self.retired, []
+        for memory in retired:
+            try:
+                memory.close()
+            except BufferError:
+                self.retired.append(memory)
+
+    @property
+    def snapshot(self) -> Snapshot:
+        mapping = self.mapping
+        if mapping is None:
+            return self.latest
+        _, header, arrays = mapping
+        if header[0] != SHARED_MEMORY_MAGIC or header[SEQUENCE] == self.sequence:
+            return self.latest
+
+        for _ in range(self.retries):
+            sequence = int(header[SEQUENCE])
+            if sequence & 1:
+                continue
+            node_count, channel_count = int(header[NODE_COUNT]), int(header[CHANNEL_COUNT])
+            node_ids, node_channels, channels, qualities = arrays
+            node_rows = tuple(zip(node_ids[:node_count].tolist(), node_channels[:node_count].tolist()))
+            channel_rows = tuple(zip(channels[:channel_count].tolist(), qualities[:channel_count].tolist()))
+            if header[SEQUENCE] == sequence and header[0] == SHARED_MEMORY_MAGIC:
+                self.sequence = sequence
+                self.latest = Snapshot(self.latest.version + 1, node_rows, channel_rows)
+                break
+        return self.latest
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.join()
+        self.detach()
+        self.close_retired()
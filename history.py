@@ -0,0 +1,110 @@
+"""
+Description: Bounded in-memory history of the channel quality estimations.
+
+Author: Willian T. Lunardi
+Contact: wtlunar@gmail.com
+License: MIT License (https://opensource.org/licenses/MIT)
+
+Repository:
+"""
+
+import warnings
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+
+class QualityHistory:
+    def __init__(self, channels: List[int], capacity: int = 3600) -> None:
+        """
+        Ring buffer of quality estimation vectors, one row per estimation and one column per channel. Once full, new
+        rows overwrite the oldest ones, so memory stays bounded however long the demo runs.
+
+        Args:
+            channels (List[int]): The channels, in column order.
+            capacity (int): The number of estimations kept.
+        """
+        self.channels: List[int] = list(channels)
+        self.columns: Dict[int, int] = {channel: column for column, channel in enumerate(self.channels)}
+        self.capacity: int = capacity
+        self.values: np.ndarray = np.full((capacity, len(self.channels)), np.nan)
+        self.times: np.ndarray = np.full(capacity, np.nan)
+        self.head: int = 0
+        self.count: int = 0
+
+    def append(self, channel_quality: Iterable[Tuple[int, float]], timestamp: float) -> np.ndarray:
+        """
+        Stores an estimation, overwriting the oldest one if the buffer is full.
+
+        Args:
+            channel_quality (Iterable[Tuple[int, float]]): The (channel, quality) rows of the estimation. Channels
+                that are not columns of the history are ignored, and columns without a row are NaN.
+            timestamp (float): The time of the estimation in seconds.
+
+        Returns:
+            np.ndarray: The stored row. It is overwritten once the buffer wraps around, so it must not be kept.
+        """
+        row: np.ndarray = self.values[self.head]
+        row.fill(np.nan)
+        for channel, quality in channel_quality:
+            column = self.columns.get(channel)
+            if column is not None:
+                row[column] = quality
+        self.times[self.head] = timestamp
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        return row
+
+    @property
+    def latest(self) -> np.ndarray:
+        """
+        The last estimation, or a row of NaN if there is none.
+        """
+        return self.values[(self.head - 1) % self.capacity]
+
+    def last(self, n: int) -> np.ndarray:
+        """
+        Returns the last n estimations, oldest first.
+
+        Args:
+            n (int): The number of estimations.
+
+        Returns:
+            np.ndarray: A (min(n, count) x channels) copy of the estimations.
+        """
+        n = min(n, self.count)
+        return self.values.take(np.arange(self.head - n, self.head) % self.capacity, axis=0)
+
+    def window(self, seconds: float, now: float) -> np.ndarray:
+        """
+        Returns the estimations of the last seconds, in storage order.
+
+        Args:
+            seconds (float): The length of the window in seconds.
+            now (float): The end of the window in seconds.
+
+        Returns:
+            np.ndarray: A (rows x channels) copy of the estimations in the window.
+        """
+        return self.values[self.times >= now - seconds]
+
+    def stats(self, seconds: float, now: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Computes the minimum, mean and maximum quality of every channel over the last seconds.
+
+        Args:
+            seconds (float): The length of the window in seconds.
+            now (float): The end of the window in seconds.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: The minimum, mean and maximum per channel, NaN for channels
+                without estimations in the window.
+        """
+        window: np.ndarray = self.window(seconds, now)
+        if len(window) == 0:
+            empty: np.ndarray = np.full(len(self.channels), np.nan)
+            return empty, empty.copy(), empty.copy()
+        with warnings.catch_warnings():
+            # Columns without estimations are all NaN
+            warnings.simplefilter('ignore', RuntimeWarning)
+            return np.nanmin(window, axis=0), np.nanmean(window, axis=0), np.nanmax(window, axis=0)
@@ -6,65 +6,81 @@ License: MIT License (https://opensource.org/licenses/MIT)
 Repository:
 """
 
+import time
+
+# Taken before the other imports, so that --startup-profile accounts for them
+IMPORT_START: float = time.perf_counter()
+
 import logging
-import sqlite3
-from typing import List
+from typing import List, Union
 
 import pygame
 
-from bar_plot import BarPlot
-from node import Node
+from animation import Timeline
+from assets import Assets
+from dashboard import Dashboard
+from data_source import DataSource, SharedMemoryDataSource
 from options import Options
-from util import Screen, Font, Colors, quit_pygame
+from renderer import FrameScheduler
+from startup import StartupProfile
+from text import TextCache
+from util import Screen, Font, quit_pygame
 
 logging.basicConfig(level=logging.INFO)
 
 
 def main() -> None:
+    profile: StartupProfile = StartupProfile(IMPORT_START)
+    profile.mark('imports')
     args: Options = Options()
 
+    # Render a scripted scenario headless instead of showing the dashboard
+    if args.benchmark:
+        from benchmark import run_benchmark
+        run_benchmark(args)
+        return
+
+    # Decode the sprites in the background while Pygame and the window are set up
+    assets: Assets = Assets.get_instance()
+    assets.prefetch()
+
     # Initialize Pygame
     pygame.init()
+    profile.mark('pygame_init')
 
     # Set up the screen
     screen: pygame.Surface = Screen.get_instance(args)
     font: pygame.font.Font = Font.get_instance(24)
-
-    # Create mesh nodes and jammer
-    mesh_nodes: List[Node] = [Node(f'Node {i + 1}', -1, ((args.screen_size[0] // 2) - args.node_spacing + (i * args.node_spacing), (args.top_height // 4))) for i in range(3)]
-    jammer: Node = Node('Jammer', None, (args.screen_size[0] // 2, 3 * args.top_height // 4))
-
-    # Create the bar plot
-    channels: List[int] = [36, 40, 44, 48, 52, 56, 60, 64, 149, 153, 157, 161, 165]
-    plot_width: int = args.screen_width
-    plot_height: int = args.screen_height // 2
-    bar_plot: BarPlot = BarPlot(
-        x=args.screen_size[0] // 2 - plot_width // 2,
-        y=args.screen_size[1] - plot_height,
-        width=plot_width,
-        height=plot_height,
-        x_axis=channels,
-        x_title='5GHz Channels',
-        y_title='Estimated Channel Quality'
-    )
-
-    # Connect to the database
-    conn = sqlite3.connect('server/demo.db')
-    c = conn.cursor()
-    current_channel = -1
+    profile.mark('window')
+
+    # Scale sprites to the resolution picked for the screen
+    assets.set_resolution(args.screen_width, args.screen_height)
+    assets.wait()
+    profile.mark('assets')
+
+    # Create mesh nodes, jammer and bar plot
+    dashboard: Dashboard = Dashboard(args, screen, font)
+    scheduler: FrameScheduler = FrameScheduler(args.fps, args.idle_fps)
+    profile.mark('dashboard')
+
+    # Read the state published by the server in shared memory, or poll the database in the background
+    data_source: Union[DataSource, SharedMemoryDataSource]
+    if args.shared_memory:
+        data_source = SharedMemoryDataSource(args.shared_memory)
+    else:
+        data_source = DataSource('server/demo.db')
+    data_source.start()
 
     # Main loop
     done: bool = False
+    first_frame: bool = True
     while not done:
-        # Check for latest wireless scanner channel on database
-        latest_channel = None
-        try:
-            c.execute("SELECT * FROM node_channels")
-            results = c.fetchall()
-            if results is not None:
-                latest_channel = int(results[0][1])
-        except Exception as e:
-            logging.error("Database connection error", exc_info=True)
+        # Animations run on the monotonic clock, only the estimation history is timestamped with the wall clock
+        now: float = time.monotonic()
+        Timeline.get_instance().update(now)
+
+        # Pick up the latest snapshot of the state, if it changed
+        data_changed: bool = dashboard.apply_snapshot(data_source.snapshot)
 
         # Check for events
         for event in pygame.event.get():
@@ -75,42 +91,22 @@ def main() -> None:
             #     for node in mesh_nodes:
             #         node.change_channel(int(r * 10))
 
-        # Check if latest channel is different from current, if yes, update text with animation
-        if latest_channel is not None and latest_channel != current_channel:
-            current_channel = latest_channel
-            for node in mesh_nodes:
-                node.change_channel(latest_channel)
-
-        # Clear the screen
-        screen.fill(Colors.WHITE.value)
-
-        # Add border around whole screen
-        pygame.draw.rect(screen, (0, 0, 0), (0, 0, args.screen_width, args.screen_height), 1)
-
-        # Draw mesh nodes
-        for node in mesh_nodes:
-            node.draw(screen, font)
-
-        # Draw jammer
-        jammer.draw(screen, font)
-
-        # Draw plot by loading quality estimation values from database
-        try:
-            c.execute("SELECT * FROM channel_quality")
-            results = c.fetchall()
-            if results is not None:
-                values = [None] * len(channels)
-                for row in results:
-                    if row[0] in channels:
-                        values[channels.index(row[0])] = row[1]
-                bar_plot.draw(screen, font, values, current_channel)
-        except Exception as e:
-            logging.error("Database connection error", exc_info=True)
-
-        # Update the display
-        pygame.display.flip()
+        # Only redraw what changed on top of the background layer
+        rects: List[pygame.Rect] = dashboard.render(now)
+        if first_frame:
+            first_frame = False
+            profile.mark('first_frame')
+            if args.startup_profile:
+                logging.info("Startup profile, sprites decoded in %.1f ms in the background:\n%s", assets.prefetch_time * 1e3, profile.report())
+
+        # Run at full rate only while something is animating or changing
+        scheduler.tick(dashboard.active or data_changed or bool(rects))
 
     # Quit Pygame
+    logging.info("Text cache: %s", TextCache.get_instance().stats())
+    logging.info("Renderer: %s", dashboard.renderer.stats())
+    logging.info("Frame scheduler: %s", scheduler.stats())
+    data_source.stop()
     quit_pygame()
 
 
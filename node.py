@@ -8,33 +8,92 @@ License: MIT License (https://opensource.org/licenses/MIT)
 Repository:
 """
 
+from typing import Dict, List, Optional, Tuple, Union
+
+import pygame
+
+from animation import Highlight
+from assets import Assets
 from text import Text
-from util import *
+from util import Colors, Vec2
+
+# Intensity levels of the ring highlighting a node that switched channel, a level change redraws the node
+HIGHLIGHT_LEVELS: int = 32
+
+# Rings per size and intensity level, shared by all nodes
+rings: Dict[Tuple[Tuple[int, int], int], pygame.Surface] = {}
+
+
+def get_ring(size: Tuple[int, int], level: int) -> pygame.Surface:
+    ring: Optional[pygame.Surface] = rings.get((size, level))
+    if ring is None:
+        ring = pygame.Surface(size, pygame.SRCALPHA)
+        pygame.draw.ellipse(ring, (*Colors.GREEN.value, 255 * level // HIGHLIGHT_LEVELS), ring.get_rect(), max(2, size[0] // 16))
+        rings[(size, level)] = ring
+    return ring
 
 
 class Node:
-    def __init__(self, name: str, channel: int, position: Tuple[int, int]):
+    def __init__(self, name: str, channel: int, position: Tuple[int, int], scale: Optional[float] = None, compact: bool = False):
         self.channel: int = channel
-        if name == 'Jammer':
-            self.sprite: pygame.Surface = pygame.image.load(f'sprites/node_red.png').convert_alpha()
-        else:
-            self.sprite: pygame.Surface = pygame.image.load(f'sprites/node_green2.png').convert_alpha()
-        self.shadow: pygame.Surface = pygame.image.load(f'sprites/node_shadow.png').convert_alpha()
+        self.sprite_name: str = 'node_red' if name == 'Jammer' else 'node_green2'
+        self.compact: bool = compact
+        self.highlight: Highlight = Highlight()
+        self.drawn_highlight: int = 0
+
+        # Text positions are set by place
+        self.name: Text = Text(name, (0, 0))
+        self.channel_text: Text = Text(self.channel_label(channel), (0, 0)) if channel is not None else None
+        self.place(position, scale)
+
+    def place(self, position: Union[Vec2, Tuple[int, int]], scale: Optional[float] = None) -> None:
+        assets: Assets = Assets.get_instance()
+        self.sprite: pygame.Surface = assets.get(self.sprite_name, scale)
+        self.shadow: pygame.Surface = assets.get('node_shadow', scale)
         self.rect: pygame.Rect = self.sprite.get_rect()
         self.position: Vec2 = position if isinstance(position, Vec2) else Vec2(*position)
+        self.rect.center = (self.position.x, self.position.y)
 
         # Set text positions
-        self.name: Text = Text(name, self.position + Vec2(0, self.rect.height // 2))
-        self.channel_text: Text = Text(f'Channel: {channel}', self.position - Vec2(0, self.rect.height // 2)) if channel is not None else None
+        self.name.position = self.position + Vec2(0, self.rect.height // 2)
+        if self.channel_text is not None:
+            self.channel_text.position = self.position - Vec2(0, self.rect.height // 2)
+
+    def channel_label(self, channel: int) -> str:
+        return str(channel) if self.compact else f'Channel: {channel}'
 
     def draw(self, surface: pygame.Surface, font: pygame.font.Font) -> None:
-        self.rect.center = (self.position.x, self.position.y)
-        surface.blit(self.shadow, self.rect)
-        surface.blit(self.sprite, self.rect)
+        self.draw_static(surface, font)
         if self.channel_text is not None:
             self.channel_text.draw(surface, font)
+
+    def draw_static(self, surface: pygame.Surface, font: pygame.font.Font) -> None:
+        surface.blit(self.shadow, self.rect)
+        surface.blit(self.sprite, self.rect)
         self.name.draw(surface, font)
 
+    def redraw(self, surface: pygame.Surface, background: pygame.Surface, font: pygame.font.Font, force: bool = False) -> List[pygame.Rect]:
+        if self.channel_text is None:
+            return []
+        level: int = round(self.highlight.intensity * HIGHLIGHT_LEVELS)
+        if level == self.drawn_highlight and not (force and level):
+            return self.channel_text.redraw(surface, background, font, force)
+
+        # The ring is drawn over the sprite and under the labels, which are drawn again on top of it
+        name_text, name_pos = self.name.render(font)
+        area: pygame.Rect = self.rect.union(name_text.get_rect(topleft=name_pos))
+        if self.channel_text.drawn_rect is not None:
+            area.union_ip(self.channel_text.drawn_rect)
+        if not force:
+            surface.blit(background, area, area)
+        if level:
+            surface.blit(get_ring(self.rect.size, level), self.rect)
+            surface.blit(name_text, name_pos)
+        self.drawn_highlight = level
+        return [area] + self.channel_text.redraw(surface, background, font, force=True)
+
     def change_channel(self, new_channel: int) -> None:
-        self.channel_text.update_text(new_text=f'Channel: {new_channel}', blinking_message=f'Moving to {new_channel} (from {self.channel})')
+        blinking_message: str = str(new_channel) if self.compact else f'Moving to {new_channel} (from {self.channel})'
+        self.channel_text.update_text(new_text=self.channel_label(new_channel), blinking_message=blinking_message)
+        self.highlight.start()
         self.channel: int = new_channel
@@ -12,6 +12,13 @@ import argparse
 from typing import Tuple
 
 
+def positive_int(value: str) -> int:
+    number: int = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"{value} is not a positive integer")
+    return number
+
+
 class Options:
     def __init__(self):
         self.full_screen: bool = False
@@ -21,7 +28,19 @@ class Options:
         self.top_height: int = 0
         self.font_size: int = 0
         self.noise: float = 0.05
+        self.fps: int = 60
+        self.idle_fps: int = 5
+        self.waterfall: bool = False
+        self.shared_memory: str = ''
+        self.startup_profile: bool = False
+        self.benchmark: bool = False
+        self.benchmark_frames: int = 1000
+        self.benchmark_seed: int = 0
+        self.benchmark_nodes: int = 3
+        self.benchmark_output: str = ''
         self.screen_size: Tuple[int, int] = (self.screen_width, self.screen_height)
+        # Node spacing, top height and font size given on the command line, 0 for the ones following the resolution
+        self.requested_sizes: Tuple[int, int, int] = (0, 0, 0)
         self.parse_options()
 
     def parse_options(self) -> 'Options':
@@ -30,10 +49,20 @@ class Options:
         parser.add_argument('--full-screen', action='store_true', default=self.full_screen, help='Set full screen mode')
         parser.add_argument('--screen-width', type=int, default=self.screen_width, help='Screen width in pixels')
         parser.add_argument('--screen-height', type=int, default=self.screen_height, help='Screen height in pixels')
-        parser.add_argument('--node-spacing', type=int, default=self.node_spacing, help='Spacing between nodes in pixels')
+        parser.add_argument('--node-spacing', type=int, default=self.node_spacing, help='Maximum horizontal spacing between nodes in pixels, a third of the screen width by default')
         parser.add_argument('--top-height', type=int, default=self.top_height, help='Height of the top section in pixels')
         parser.add_argument('--font-size', type=int, default=self.font_size, help='Font size in pixels')
         parser.add_argument('--noise', type=float, default=self.noise, help='Amount of noise to add to the distribution')
+        parser.add_argument('--fps', type=int, default=self.fps, help='Target frame rate while animating, 0 for uncapped')
+        parser.add_argument('--idle-fps', type=positive_int, default=self.idle_fps, help='Frame rate while nothing is animating, at least 1')
+        parser.add_argument('--waterfall', action='store_true', default=self.waterfall, help='Show the channel quality history next to the bar plot')
+        parser.add_argument('--shared-memory', type=str, default=self.shared_memory, help='Read the state from this shared memory segment of server.py --shared-memory instead of the database')
+        parser.add_argument('--startup-profile', action='store_true', default=self.startup_profile, help='Report the time spent in each startup phase')
+        parser.add_argument('--benchmark', action='store_true', default=self.benchmark, help='Render a scripted scenario headless and report frame times')
+        parser.add_argument('--benchmark-frames', type=int, default=self.benchmark_frames, help='Number of frames to render in benchmark mode')
+        parser.add_argument('--benchmark-seed', type=int, default=self.benchmark_seed, help='Seed of the scripted scenario in benchmark mode')
+        parser.add_argument('--benchmark-nodes', type=int, default=self.benchmark_nodes, help='Number of mesh nodes of the scripted scenario in benchmark mode')
+        parser.add_argument('--benchmark-output', type=str, default=self.benchmark_output, help='Path of a JSON file to write the benchmark report to')
 
         args = parser.parse_args()
 
@@ -43,7 +72,18 @@ class Options:
         self.node_spacing = args.node_spacing
         self.top_height = args.top_height
         self.font_size = args.font_size
+        self.requested_sizes = (args.node_spacing, args.top_height, args.font_size)
         self.noise = args.noise
+        self.fps = args.fps
+        self.idle_fps = args.idle_fps
+        self.waterfall = args.waterfall
+        self.shared_memory = args.shared_memory
+        self.startup_profile = args.startup_profile
+        self.benchmark = args.benchmark
+        self.benchmark_frames = args.benchmark_frames
+        self.benchmark_seed = args.benchmark_seed
+        self.benchmark_nodes = args.benchmark_nodes
+        self.benchmark_output = args.benchmark_output
 
         if self.node_spacing == 0 or self.top_height == 0 or self.font_size == 0:
             self.update_resolution(self.screen_width, self.screen_height)
@@ -53,7 +93,8 @@ class Options:
     def update_resolution(self, width: int, height: int) -> None:
         self.screen_width = width
         self.screen_height = height
-        self.node_spacing = self.screen_width // 3
-        self.top_height = self.screen_height // 2
-        self.font_size = int(0.04 * self.screen_height)
+        node_spacing, top_height, font_size = self.requested_sizes
+        self.node_spacing = node_spacing or self.screen_width // 3
+        self.top_height = top_height or self.screen_height // 2
+        self.font_size = font_size or int(0.04 * self.screen_height)
         self.screen_size = (self.screen_width, self.screen_height)
@@ -0,0 +1,113 @@
+"""
+Description: Layered renderer, drawing static elements once into a background and only pushing changed rectangles.
+
+Author: Willian T. Lunardi
+Contact: wtlunar@gmail.com
+License: MIT License (https://opensource.org/licenses/MIT)
+
+Repository:
+"""
+
+from typing import Callable, List
+
+import pygame
+
+
+class Renderer:
+    def __init__(self, screen: pygame.Surface, draw_background: Callable[[pygame.Surface], None]) -> None:
+        """
+        Renders frames in two layers. The static layer is drawn once into a cached background surface. Dynamic
+        elements restore the background under the area they last covered, draw themselves again only when their
+        state changed, and report the rectangles they touched, which are the only ones pushed to the display.
+
+        Args:
+            screen (pygame.Surface): The Pygame screen.
+            draw_background (Callable[[pygame.Surface], None]): Draws the static layer into the given surface.
+        """
+        self.screen: pygame.Surface = screen
+        self.draw_background: Callable[[pygame.Surface], None] = draw_background
+        self.background: pygame.Surface = pygame.Surface(screen.get_size()).convert()
+        self.valid: bool = False
+        self.full_redraw: bool = True
+
+        self.frames: int = 0
+        self.full_frames: int = 0
+        self.skipped_frames: int = 0
+        self.updated_rects: int = 0
+
+    def invalidate(self) -> None:
+        """
+        Requests the static layer to be drawn again on the next frame.
+        """
+        self.valid = False
+
+    def begin_frame(self) -> bool:
+        """
+        Starts a frame, redrawing the background and copying it to the screen if the static layer changed.
+
+        Returns:
+            bool: Whether this frame is a full redraw, in which case every dynamic element must draw itself.
+        """
+        self.full_redraw = not self.valid
+        if self.full_redraw:
+            self.draw_background(self.background)
+            self.screen.blit(self.background, (0, 0))
+            self.valid = True
+        return self.full_redraw
+
+    def end_frame(self, rects: List[pygame.Rect]) -> None:
+        """
+        Pushes the frame to the display.
+
+        Args:
+            rects (List[pygame.Rect]): The rectangles changed by the dynamic elements during the frame.
+        """
+        self.frames += 1
+        if self.full_redraw:
+            self.full_frames += 1
+            pygame.display.flip()
+        elif rects:
+            self.updated_rects += len(rects)
+            pygame.display.update(rects)
+        else:
+            self.skipped_frames += 1
+
+    def stats(self) -> dict:
+        return {'frames': self.frames, 'full_frames': self.full_frames, 'skipped_frames': self.skipped_frames, 'updated_rects': self.updated_rects}
+
+
+class FrameScheduler:
+    def __init__(self, fps: int = 60, idle_fps: int = 5) -> None:
+        """
+        Paces the main loop, running at the target frame rate while something is animating and dropping to the idle
+        frame rate otherwise.
+
+        Args:
+            fps (int): The target frame rate while animating, 0 for uncapped.
+            idle_fps (int): The frame rate while nothing is animating, at least 1. Pygame does not cap the frame rate
+                at 0, which would busy loop while idle.
+        """
+        self.fps: int = fps
+        self.idle_fps: int = idle_fps
+        self.clock: pygame.time.Clock = pygame.time.Clock()
+        self.active_frames: int = 0
+        self.idle_frames: int = 0
+
+    def tick(self, active: bool) -> float:
+        """
+        Waits until the next frame is due.
+
+        Args:
+            active (bool): Whether a tween, blink or data change is pending.
+
+        Returns:
+            float: The time elapsed since the previous frame in seconds.
+        """
+        if active:
+            self.active_frames += 1
+            return self.clock.tick(self.fps) / 1000
+        self.idle_frames += 1
+        return self.clock.tick(self.idle_fps) / 1000
+
+    def stats(self) -> dict:
+        return {'active_frames': self.active_frames, 'idle_frames': self.idle_frames, 'fps': round(self.clock.get_fps(), 1)}
@@ -0,0 +1,320 @@
+import argparse
+import asyncio
+import os
+import random
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+from fanout import DROP_OLDEST, SLOW_CONSUMER_POLICIES
+from protocol import ENCODING_BINARY, ENCODING_JSON, FrameDecoder, encode_estimation, encode_message
+from radio import STEPS, ShellRadio, SimulatedRadio
+from server import AsyncServer, DatasetManager, Server
+from switch_channel import ChannelSwitcher
+from writer import DatabaseWriter, percentile
+
+
+def benchmark_encoding(args: argparse.Namespace) -> None:
+    """
+    Compares the bytes on the wire and the encode/decode cost of new_estimation messages in both encodings.
+
+    :param args: The parsed command line arguments.
+    """
+    print(f"{'channels':>8} {'encoding':>8} {'bytes/msg':>10} {'encode us/msg':>14} {'decode us/msg':>14}")
+    for count in args.channels:
+        channels = list(range(count))
+        estimations = [[random.random() for _ in channels] for _ in range(args.messages)]
+        for encoding in (ENCODING_JSON, ENCODING_BINARY):
+            start = time.perf_counter()
+            frames = [encode_estimation(channel_quality, channels, encoding) for channel_quality in estimations]
+            encode_time = time.perf_counter() - start
+            stream = b''.join(frames)
+
+            decoder = FrameDecoder(buffer_size=len(stream))
+            decoder.set_encoding(encoding)
+            decoder.feed(stream)
+            start = time.perf_counter()
+            decoded = sum(1 for _ in decoder.messages())
+            decode_time = time.perf_counter() - start
+            assert decoded == args.messages
+
+            print(f"{count:>8} {encoding:>8} {len(stream) / args.messages:>10.1f} {encode_time / args.messages * 1e6:>14.2f} "
+                  f"{decode_time / args.messages * 1e6:>14.2f}")
+
+
+def run_producers(args: argparse.Namespace, produce: Callable[[int, random.Random], None]) -> Tuple[List[float], int]:
+    """
+    Runs the producer threads of the writer benchmark next to a reader polling both tables like the UI does.
+
+    Every producer offers messages at the same fixed rate for the same duration, whatever the writer under test, so
+    that both writers are measured under the same load. A producer that falls behind catches up without sleeping.
+
+    :param args: The parsed command line arguments.
+    :param produce: Called by each producer with its index and random generator once per message.
+    :return: The latencies of the reader queries and the number of messages produced.
+    """
+    done = threading.Event()
+    read_latencies: List[float] = []
+    produced = [0] * args.producers
+    messages = int(args.rate * args.duration)
+
+    def read() -> None:
+        with sqlite3.connect('demo.db') as conn:
+            while not done.is_set():
+                start = time.perf_counter()
+                conn.execute("SELECT * FROM node_channels").fetchall()
+                conn.execute("SELECT * FROM channel_quality").fetchall()
+                read_latencies.append(time.perf_counter() - start)
+                time.sleep(0.001)
+
+    def run(index: int, start: float) -> None:
+        rng = random.Random(index)
+        # Producers are spread evenly over the message interval instead of all producing at once
+        offset = index / args.producers
+        for sent in range(messages):
+            delay = start + (sent + offset) / args.rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            produce(index, rng)
+            produced[index] += 1
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    start = time.perf_counter()
+    producers = [threading.Thread(target=run, args=(i, start)) for i in range(args.producers)]
+    for producer in producers:
+        producer.start()
+    for producer in producers:
+        producer.join()
+    done.set()
+    reader.join()
+    return read_latencies, sum(produced)
+
+
+def benchmark_writer(args: argparse.Namespace) -> None:
+    """
+    Compares per-message commits on per-client connections with the coalescing database writer, both fed the same
+    fixed message rate.
+
+    :param args: The parsed command line arguments.
+    """
+    channels = list(range(args.channels))
+    os.chdir(tempfile.mkdtemp())
+
+    # One connection per producer, one commit per message, default rollback journal
+    DatasetManager()
+    with sqlite3.connect('demo.db') as conn:
+        conn.execute('PRAGMA journal_mode=DELETE')
+    connections = [sqlite3.connect('demo.db', timeout=60, check_same_thread=False) for _ in range(args.producers)]
+    latencies: List[List[float]] = [[] for _ in range(args.producers)]
+
+    def commit_per_message(index: int, rng: random.Random) -> None:
+        conn = connections[index]
+        start = time.perf_counter()
+        if rng.random() < 0.5:
+            conn.execute("REPLACE INTO node_channels (node_id, channel) VALUES (?, ?)", (rng.randrange(args.nodes), rng.choice(channels)))
+        else:
+            for channel in channels:
+                conn.execute("REPLACE INTO channel_quality (channel, quality) VALUES (?, ?)", (channel, rng.random()))
+        conn.commit()
+        latencies[index].append(time.perf_counter() - start)
+
+    print(f"Offering {args.producers} x {args.rate:.0f} messages/s for {args.duration:.0f} s")
+    start = time.perf_counter()
+    read_latencies, commits = run_producers(args, commit_per_message)
+    elapsed = time.perf_counter() - start
+    print(f"{'writer':>12} {'messages/s':>11} {'commits/s':>10} {'p99 write ms':>13} {'p99 read ms':>12} {'max read ms':>12}")
+    print(f"{'per-message':>12} {commits / elapsed:>11.0f} {commits / elapsed:>10.0f} "
+          f"{percentile(sum(latencies, []), 99) * 1e3:>13.2f} {percentile(read_latencies, 99) * 1e3:>12.2f} {max(read_latencies) * 1e3:>12.2f}")
+    for conn in connections:
+        conn.close()
+
+    # Coalescing writer in WAL mode
+    DatasetManager()
+    writer = DatabaseWriter(flush_interval=args.flush_interval)
+    writer.start()
+
+    def coalesce(index: int, rng: random.Random) -> None:
+        if rng.random() < 0.5:
+            writer.update_node_channel(rng.randrange(args.nodes), rng.choice(channels))
+        else:
+            writer.store_channel_quality([rng.random() for _ in channels], channels)
+
+    start = time.perf_counter()
+    read_latencies, _ = run_producers(args, coalesce)
+    writer.stop()
+    elapsed = time.perf_counter() - start
+    stats = writer.stats()
+    print(f"{'coalescing':>12} {stats['updates'] / elapsed:>11.0f} {stats['commits'] / elapsed:>10.0f} "
+          f"{stats['p99_write_latency'] * 1e3:>13.2f} {percentile(read_latencies, 99) * 1e3:>12.2f} {max(read_latencies) * 1e3:>12.2f}")
+
+
+def benchmark_fanout(args: argparse.Namespace) -> None:
+    """
+    Measures the latency from a broadcast to its delivery as the number of clients grows, with stalled clients that
+    never read connected next to them.
+
+    :param args: The parsed command line arguments.
+    """
+    print(f"{'clients':>8} {'stalled':>8} {'delivered':>10} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'send ms':>8} {'dropped':>8}")
+    for count in args.clients:
+        # The database writer is only used by channel_switch and new_estimation, never started here
+        writer = DatabaseWriter(database=':memory:')
+        if args.asyncio:
+            server = AsyncServer('127.0.0.1', 0, writer, args.queue_size, args.slow_consumer)
+            threading.Thread(target=asyncio.run, args=(server.serve(),), daemon=True).start()
+        else:
+            server = Server('127.0.0.1', 0, writer, args.queue_size, args.slow_consumer)
+            threading.Thread(target=server.serve, daemon=True).start()
+        server.listening.wait()
+
+        latencies: List[float] = []
+
+        def receive(sock: socket.socket) -> None:
+            decoder = FrameDecoder()
+            received = 0
+            while received < args.messages and decoder.recv_from(sock):
+                for message in decoder.messages():
+                    latencies.append(time.perf_counter() - message['sent_at'])
+                    received += 1
+
+        receivers = [socket.create_connection(('127.0.0.1', server.port)) for _ in range(count)]
+        stalled = []
+        for _ in range(args.stalled):
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+            sock.connect(('127.0.0.1', server.port))
+            stalled.append(sock)
+        sender = socket.create_connection(('127.0.0.1', server.port))
+        connections = server.connections if args.asyncio else server.clients
+        while len(connections) < count + args.stalled + 1:
+            time.sleep(0.01)
+
+        threads = [threading.Thread(target=receive, args=(sock,), daemon=True) for sock in receivers]
+        for thread in threads:
+            thread.start()
+        payload = 'x' * args.size
+        start = time.perf_counter()
+        for _ in range(args.messages):
+            sender.sendall(encode_message({'action': 'broadcast', 'sent_at': time.perf_counter(), 'payload': payload}))
+            time.sleep(args.interval)
+        send_time = time.perf_counter() - start - args.messages * args.interval
+        for thread in threads:
+            thread.join(timeout=10)
+
+        queues = [connection.send_queue for connection in list(connections)]
+        dropped = sum(queue.dropped for queue in queues)
+        for sock in receivers + stalled + [sender]:
+            sock.close()
+        print(f"{count:>8} {args.stalled:>8} {len(latencies):>10} {percentile(latencies, 50) * 1e3:>8.2f} {percentile(latencies, 99) * 1e3:>8.2f} "
+              f"{max(latencies, default=0) * 1e3:>8.2f} {send_time * 1e3:>8.1f} {dropped:>8}")
+
+
+def benchmark_switch(args: argparse.Namespace) -> None:
+    """
+    Profiles channel switches step by step, on a simulated radio unless --shell is given.
+
+    :param args: The parsed command line arguments.
+    """
+    radio = ShellRadio(args.interface) if args.shell else SimulatedRadio(args.latency, args.jitter)
+    done = threading.Event()
+    failed: List[int] = []
+
+    def fail(freq: int) -> None:
+        failed.append(freq)
+        done.set()
+
+    switcher = ChannelSwitcher(radio, on_switched=lambda freq: done.set(), poll_interval=args.poll_interval, history=args.switches,
+                               on_failed=fail)
+    switcher.start()
+    # A switch waits for the radio at most down_timeout and up_timeout, the other steps get the rest of the timeout
+    timeout = switcher.down_timeout + switcher.up_timeout + args.timeout
+    for i in range(args.switches):
+        freq = args.frequencies[i % len(args.frequencies)]
+        done.clear()
+        switcher.request(freq)
+        if not done.wait(timeout):
+            print(f"Switch to {freq} MHz not done after {timeout:.0f} s, giving up")
+            break
+    switcher.stop()
+    if failed:
+        print(f"{len(failed)} switches failed")
+
+    profiles = list(switcher.profiles)
+    if not profiles:
+        print("No channel switch profiled")
+        return
+    totals = [profile.total for profile in profiles]
+    print(f"{'step':>16} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'share':>6}")
+    for step in STEPS + ('total',):
+        durations = totals if step == 'total' else [profile.steps.get(step, 0.0) for profile in profiles]
+        print(f"{step:>16} {percentile(durations, 50) * 1e3:>8.1f} {percentile(durations, 99) * 1e3:>8.1f} {max(durations) * 1e3:>8.1f} "
+              f"{sum(durations) / sum(totals):>6.1%}")
+    unconfirmed = sum(not profile.confirmed for profile in profiles)
+    if unconfirmed:
+        print(f"{unconfirmed} of {len(profiles)} switches not confirmed by the radio")
+
+
+def parse_latencies(value: str) -> Dict[str, float]:
+    latencies = {}
+    for item in value.split(','):
+        step, _, latency = item.partition('=')
+        if step not in STEPS:
+            raise argparse.ArgumentTypeError(f"Unknown step {step}, expected one of {', '.join(STEPS)}")
+        latencies[step] = float(latency)
+    return latencies
+
+
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Mesh Network Jamming Avoidance Demo Server benchmarks')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    encoding = subparsers.add_parser('encoding', help='Compare the JSON and binary new_estimation encodings')
+    encoding.add_argument('--channels', type=int, nargs='+', default=[13, 64, 256], help='Number of channels per estimation')
+    encoding.add_argument('--messages', type=int, default=10000, help='Number of messages to encode and decode')
+    encoding.set_defaults(run=benchmark_encoding)
+
+    writer = subparsers.add_parser('writer', help='Compare per-message commits with the coalescing database writer')
+    writer.add_argument('--producers', type=int, default=8, help='Number of client threads producing updates')
+    writer.add_argument('--rate', type=float, default=100, help='Messages per second offered by each producer')
+    writer.add_argument('--duration', type=float, default=5, help='Duration of each run in seconds')
+    writer.add_argument('--nodes', type=int, default=100, help='Number of distinct nodes')
+    writer.add_argument('--channels', type=int, default=13, help='Number of channels per estimation')
+    writer.add_argument('--flush-interval', type=float, default=0.05, help='Coalescing window of the writer in seconds')
+    writer.set_defaults(run=benchmark_writer)
+
+    fanout = subparsers.add_parser('fanout', help='Measure broadcast fan-out latency as the number of clients grows')
+    fanout.add_argument('--clients', type=int, nargs='+', default=[1, 10, 50, 100], help='Number of reading clients')
+    fanout.add_argument('--stalled', type=int, default=1, help='Number of clients that never read')
+    fanout.add_argument('--messages', type=int, default=500, help='Number of broadcast messages')
+    fanout.add_argument('--size', type=int, default=1024, help='Payload size of the messages in bytes')
+    fanout.add_argument('--interval', type=float, default=0.002, help='Interval between messages in seconds')
+    fanout.add_argument('--queue-size', type=int, default=256, help='Number of outbound frames queued per client')
+    fanout.add_argument('--slow-consumer', choices=SLOW_CONSUMER_POLICIES, default=DROP_OLDEST, help='Slow consumer policy')
+    fanout.add_argument('--asyncio', action='store_true', help='Benchmark the asyncio server instead of the threaded one')
+    fanout.set_defaults(run=benchmark_fanout)
+
+    switch = subparsers.add_parser('switch', help='Profile the steps of channel switches')
+    switch.add_argument('--switches', type=int, default=20, help='Number of channel switches')
+    switch.add_argument('--frequencies', type=int, nargs='+', default=[5180, 5200], help='Frequencies switched between in MHz')
+    switch.add_argument('--latency', type=parse_latencies, default={}, help='Step latencies of the simulated radio in seconds, e.g. link_up=1.5,supplicant_kill=0.2')
+    switch.add_argument('--jitter', type=float, default=0.1, help='Relative random variation of the simulated latencies')
+    switch.add_argument('--timeout', type=float, default=10, help='Time allowed for the steps of a switch besides the waits for the radio, in seconds')
+    switch.add_argument('--poll-interval', type=float, default=0.1, help='Interval between radio readiness checks in seconds')
+    switch.add_argument('--shell', action='store_true', help='Switch the real interface instead of the simulated radio')
+    switch.add_argument('--interface', type=str, default='wlp1s0', help='Wireless interface switched with --shell')
+    switch.set_defaults(run=benchmark_switch)
+
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    args.run(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,17 +1,22 @@
-import json
 import random
 import socket
 import threading
 import time
 
+from protocol import ENCODING_JSON, FrameDecoder, encode_estimation, encode_message, hello_message
+
+CHANNELS = [36, 40, 44, 48, 52, 56, 60, 64, 149, 153, 157, 161, 165]
+
 
 class Client(threading.Thread):
-    def __init__(self, node_id, channel, host, port):
+    def __init__(self, node_id, channel, host, port, estimations=False):
         threading.Thread.__init__(self)
         self.node_id = node_id
         self.channel = channel
         self.host = host
         self.port = port
+        self.estimations = estimations
+        self.encoding = ENCODING_JSON
         self.running = True
 
     def run(self):
@@ -22,30 +27,39 @@ class Client(threading.Thread):
             receive_thread = threading.Thread(target=self.receive_messages, args=(s,))
             receive_thread.start()
 
+            # offer the binary estimation encoding, JSON is used until the server accepts it
+            s.sendall(encode_message(hello_message()))
+
             while self.running:
 
-                self.channel = random.choice([36, 40, 44, 48, 52, 56, 60, 64, 149, 153, 157, 161, 165])
+                self.channel = random.choice(CHANNELS)
                 data = {'action': 'channel_switch', 'node_id': self.node_id, 'channel': self.channel}
-                json_str = json.dumps(data)
-                s.send(json_str.encode())
-                print(f'sent: {json_str}')
+                s.sendall(encode_message(data))
+                print(f'sent: {data}')
+
+                if self.estimations:
+                    channel_quality = [random.random() for _ in CHANNELS]
+                    s.sendall(encode_estimation(channel_quality, CHANNELS, self.encoding))
+                    print(f'sent estimation ({self.encoding})')
                 time.sleep(10)
                 # print('sent')
 
                 # if self.node_id == 1:
                 #     data = {'action': 'broadcast', 'channel': 1}
-                #     json_str = json.dumps(data)
-                #     s.send(json_str.encode())
+                #     s.sendall(encode_message(data))
                 #     print('sent')
 
     def receive_messages(self, s):
+        decoder = FrameDecoder()
         while self.running:
-            data = s.recv(1024).decode()
-            if data:
-                message = json.loads(data)
+            if not decoder.recv_from(s):
+                break
+            for message in decoder.messages():
                 action = message.get("action")
                 if action == "broadcast":
                     print(f"Node {self.node_id} received broadcast: {message}")
+                elif action == "hello":
+                    self.encoding = message["encoding"]
 
     def stop(self):
         self.running = False
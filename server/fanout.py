@@ -0,0 +1,218 @@
+import asyncio
+import logging
+import socket
+import threading
+from collections import deque
+from typing import Generic, Iterator, Tuple, TypeVar
+
+from metrics import Metrics
+
+logging.basicConfig(level=logging.INFO)
+
+# Policies for consumers whose send queue is full
+DROP_OLDEST = "drop-oldest"
+DISCONNECT = "disconnect"
+SLOW_CONSUMER_POLICIES = (DROP_OLDEST, DISCONNECT)
+
+T = TypeVar("T")
+
+
+class ClientRegistry(Generic[T]):
+    def __init__(self):
+        """
+        Initializes the ClientRegistry object, the thread-safe set of connected clients.
+
+        Broadcasts iterate over an immutable snapshot that is only replaced when a client joins or leaves, so senders
+        never hold the lock while sending.
+        """
+        self.lock = threading.Lock()
+        self.clients: Tuple[T, ...] = ()
+
+    def add(self, client: T) -> None:
+        with self.lock:
+            self.clients = self.clients + (client,)
+
+    def remove(self, client: T) -> bool:
+        """
+        Removes a client, if it is still registered.
+
+        :param client: The client to remove.
+        :return: Whether the client was registered.
+        """
+        with self.lock:
+            if client not in self.clients:
+                return False
+            self.clients = tuple(c for c in self.clients if c is not client)
+            return True
+
+    def snapshot(self) -> Tuple[T, ...]:
+        return self.clients
+
+    def __iter__(self) -> Iterator[T]:
+        return iter(self.clients)
+
+    def __len__(self) -> int:
+        return len(self.clients)
+
+
+class SendQueue(threading.Thread):
+    def __init__(self, sock: socket.socket, address: Tuple[str, int], max_size: int = 256, policy: str = DROP_OLDEST):
+        """
+        Initializes the SendQueue object, the bounded outbound queue of a connection, drained by its own thread so
+        that senders never block on a slow or stalled peer.
+
+        :param sock: The connected socket.
+        :param address: The address of the peer.
+        :param max_size: The number of frames queued before the slow consumer policy applies.
+        :param policy: DROP_OLDEST to discard the oldest queued frame, DISCONNECT to close the connection.
+        """
+        threading.Thread.__init__(self, daemon=True)
+        if policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Unknown slow consumer policy {policy}")
+        self.socket = sock
+        self.address = address
+        self.max_size = max_size
+        self.policy = policy
+        self.queue: deque = deque()
+        self.condition = threading.Condition()
+        self.closed = False
+        self.sent = 0
+        self.dropped = 0
+
+    def put(self, data: bytes) -> bool:
+        """
+        Queues an encoded frame without blocking.
+
+        :param data: The frame.
+        :return: False if the connection is closed, or was closed because the peer could not keep up.
+        """
+        with self.condition:
+            if self.closed:
+                return False
+            if len(self.queue) >= self.max_size:
+                if self.policy == DISCONNECT:
+                    logging.warning("Disconnecting slow client %s, %d frames queued", self.address, len(self.queue))
+                    Metrics.get_instance().increment("send_queue.disconnected")
+                    self.closed = True
+                    self.condition.notify()
+                    self.shutdown()
+                    return False
+                self.queue.popleft()
+                self.dropped += 1
+                Metrics.get_instance().increment("send_queue.dropped")
+            self.queue.append(data)
+            self.condition.notify()
+            return True
+
+    def run(self) -> None:
+        """
+        Sends the queued frames, all frames queued since the previous send going out in a single sendall.
+        """
+        while True:
+            with self.condition:
+                while not self.queue and not self.closed:
+                    self.condition.wait()
+                if self.closed:
+                    break
+                frames, self.queue = self.queue, deque()
+
+            try:
+                data = b"".join(frames)
+                self.socket.sendall(data)
+                self.sent += len(frames)
+                Metrics.get_instance().increment("send_queue.bytes_sent", len(data))
+            except OSError:
+                logging.warning("Send failed, client disconnected: %s", self.address)
+                self.close()
+                self.shutdown()
+                break
+
+    def shutdown(self) -> None:
+        """
+        Shuts the socket down, which also ends the receive loop of the connection.
+        """
+        try:
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def close(self) -> None:
+        """
+        Stops the sending thread, discarding the frames still queued.
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+
+
+class AsyncSendQueue:
+    def __init__(self, writer: asyncio.StreamWriter, address: Tuple[str, int], max_size: int = 256, policy: str = DROP_OLDEST):
+        """
+        Initializes the AsyncSendQueue object, the bounded outbound queue of an asyncio connection, drained by its
+        own task so that a broadcast never awaits a slow or stalled peer.
+
+        :param writer: The stream writer of the connection.
+        :param address: The address of the peer.
+        :param max_size: The number of frames queued before the slow consumer policy applies.
+        :param policy: DROP_OLDEST to discard the oldest queued frame, DISCONNECT to close the connection.
+        """
+        if policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Unknown slow consumer policy {policy}")
+        self.writer = writer
+        self.address = address
+        self.max_size = max_size
+        self.policy = policy
+        self.queue: deque = deque()
+        self.ready = asyncio.Event()
+        self.closed = False
+        self.sent = 0
+        self.dropped = 0
+
+    def put(self, data: bytes) -> bool:
+        """
+        Queues an encoded frame.
+
+        :param data: The frame.
+        :return: False if the connection is closed, or was closed because the peer could not keep up.
+        """
+        if self.closed:
+            return False
+        if len(self.queue) >= self.max_size:
+            if self.policy == DISCONNECT:
+                logging.warning("Disconnecting slow client %s, %d frames queued", self.address, len(self.queue))
+                Metrics.get_instance().increment("send_queue.disconnected")
+                self.close()
+                self.writer.transport.abort()
+                return False
+            self.queue.popleft()
+            self.dropped += 1
+            Metrics.get_instance().increment("send_queue.dropped")
+        self.queue.append(data)
+        self.ready.set()
+        return True
+
+    async def run(self) -> None:
+        """
+        Sends the queued frames until the queue is closed.
+        """
+        while True:
+            await self.ready.wait()
+            self.ready.clear()
+            if self.closed:
+                break
+            frames, self.queue = self.queue, deque()
+
+            try:
+                data = b"".join(frames)
+                self.writer.write(data)
+                await self.writer.drain()
+                self.sent += len(frames)
+                Metrics.get_instance().increment("send_queue.bytes_sent", len(data))
+            except ConnectionError:
+                logging.warning("Send failed, client disconnected: %s", self.address)
+                self.close()
+                break
+
+    def close(self) -> None:
+        self.closed = True
+        self.ready.set()
@@ -0,0 +1,241 @@
+import argparse
+import asyncio
+import logging
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+from protocol import ENCODING_BINARY, ENCODING_JSON, FrameDecoder, encode_estimation, encode_message, hello_message
+from writer import percentile
+
+logging.basicConfig(level=logging.INFO)
+
+CHANNELS = [36, 40, 44, 48, 52, 56, 60, 64, 149, 153, 157, 161, 165]
+ACTIONS = ("channel_switch", "new_estimation", "broadcast")
+
+
+class LoadStep:
+    def __init__(self, rate: float):
+        """
+        Initializes the LoadStep object, the counters of a run at a given total message rate.
+
+        :param rate: The target number of messages per second, over all nodes.
+        """
+        self.rate = rate
+        self.sent = 0
+        self.pings = 0
+        self.broadcasts_received = 0
+        self.latencies: List[float] = []
+        self.elapsed = 0.0
+
+    @property
+    def achieved_rate(self) -> float:
+        return self.sent / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def lost_pongs(self) -> int:
+        return self.pings - len(self.latencies)
+
+    def p99(self) -> float:
+        return percentile(self.latencies, 99) if self.latencies else float('inf')
+
+
+class LoadGenerator:
+    def __init__(self, host: str, port: int, nodes: int, mix: Dict[str, float], ping_every: int = 10, channels: int = len(CHANNELS),
+                 seed: int = 0):
+        """
+        Initializes the LoadGenerator object, simulating many nodes and estimators from a single event loop.
+
+        Every node has its own connection and sends messages at random times, a Poisson process at its share of the
+        total rate, picking the action of each message according to the mix. Every ping_every messages, the node sending
+        the message also sends a ping, which the server answers with a pong once every message before it was handled,
+        so the round trip of pings measures the server-side processing latency under load.
+
+        :param host: The host address of the server.
+        :param port: The port number of the server.
+        :param nodes: The number of simulated nodes.
+        :param mix: The relative weight of each action in ACTIONS.
+        :param ping_every: The number of messages between pings, over all nodes.
+        :param channels: The number of channels per estimation.
+        :param seed: The seed of the random generators.
+        """
+        self.host = host
+        self.port = port
+        self.nodes = nodes
+        self.actions = [action for action in ACTIONS if mix.get(action, 0) > 0]
+        self.weights = [mix[action] for action in self.actions]
+        self.ping_every = ping_every
+        self.channels = CHANNELS[:channels] if channels <= len(CHANNELS) else list(range(channels))
+        self.seed = seed
+
+        # Estimations are encoded ahead of time, so that encoding does not limit the rate of the generator
+        rng = random.Random(seed)
+        qualities = [[rng.random() for _ in self.channels] for _ in range(64)]
+        self.estimations = {encoding: [encode_estimation(quality, self.channels, encoding) for quality in qualities]
+                            for encoding in (ENCODING_JSON, ENCODING_BINARY)}
+
+    async def connect(self, step: LoadStep) -> Tuple[asyncio.StreamWriter, Dict, asyncio.Task]:
+        """
+        Connects a node and offers the binary estimation encoding.
+
+        :param step: The counters of the run.
+        :return: The stream writer of the node, its state and its receiving task.
+        """
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        state = {"encoding": ENCODING_JSON, "pongs": 0}
+        receiver = asyncio.create_task(self.receive(reader, step, state))
+        writer.write(encode_message(hello_message()))
+        return writer, state, receiver
+
+    async def run_node(self, node_id: int, step: LoadStep, deadline: float, writer: asyncio.StreamWriter, state: Dict, receiver: asyncio.Task) -> None:
+        """
+        Simulates a single node until the deadline.
+
+        :param node_id: The ID of the node.
+        :param step: The counters of the run.
+        :param deadline: The end of the run, on the perf_counter clock.
+        :param writer: The stream writer of the node.
+        :param state: The encoding negotiated for the node and the number of pongs it received.
+        :param receiver: The receiving task of the node.
+        """
+        rng = random.Random(self.seed * 100003 + node_id)
+        rate = step.rate / self.nodes
+        pings = 0
+        next_send = time.perf_counter() + rng.expovariate(rate)
+        try:
+            # A node that falls behind its schedule stops at the deadline, sending fewer messages
+            while next_send < deadline and time.perf_counter() < deadline:
+                delay = next_send - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+                action = rng.choices(self.actions, self.weights)[0]
+                if action == "channel_switch":
+                    writer.write(encode_message({"action": "channel_switch", "node_id": node_id, "channel": rng.choice(CHANNELS)}))
+                elif action == "new_estimation":
+                    writer.write(rng.choice(self.estimations[state["encoding"]]))
+                else:
+                    writer.write(encode_message({"action": "broadcast", "node_id": node_id, "channel": rng.choice(CHANNELS)}))
+                step.sent += 1
+
+                # Pings are spread over all nodes, one every ping_every messages of the run
+                if step.sent % self.ping_every == 0:
+                    writer.write(encode_message({"action": "ping", "node_id": node_id, "sent_at": time.perf_counter()}))
+                    pings += 1
+                    step.pings += 1
+
+                # Backpressure of the server slows the node down, which shows in the achieved rate
+                await writer.drain()
+                next_send += rng.expovariate(rate)
+
+            # Leave time to the last pongs
+            wait_until = time.perf_counter() + 1.0
+            while state["pongs"] < pings and time.perf_counter() < wait_until:
+                await asyncio.sleep(0.01)
+        except ConnectionError:
+            logging.warning("Node %d disconnected by the server", node_id)
+        finally:
+            receiver.cancel()
+            writer.close()
+
+    @staticmethod
+    async def receive(reader: asyncio.StreamReader, step: LoadStep, state: Dict) -> None:
+        """
+        Handles the messages sent back by the server to a node.
+
+        :param reader: The stream reader of the node.
+        :param step: The counters of the run.
+        :param state: The encoding negotiated for the node and the number of pongs it received.
+        """
+        decoder = FrameDecoder()
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                break
+            decoder.feed(data)
+            for message in decoder.messages():
+                action = message.get("action")
+                if action == "pong":
+                    step.latencies.append(time.perf_counter() - message["sent_at"])
+                    state["pongs"] += 1
+                elif action == "broadcast":
+                    step.broadcasts_received += 1
+                elif action == "hello":
+                    state["encoding"] = message["encoding"]
+                    decoder.set_encoding(message["encoding"])
+
+    async def run(self, rate: float, duration: float) -> LoadStep:
+        """
+        Runs all nodes at the given total rate.
+
+        :param rate: The target number of messages per second, over all nodes.
+        :param duration: The duration of the run in seconds.
+        :return: The counters of the run.
+        """
+        step = LoadStep(rate)
+        connections = await asyncio.gather(*(self.connect(step) for _ in range(self.nodes)))
+        start = time.perf_counter()
+        await asyncio.gather(*(self.run_node(node_id, step, start + duration, *connection) for node_id, connection in enumerate(connections, start=1)))
+        step.elapsed = min(time.perf_counter() - start, duration)
+        return step
+
+
+def report(step: LoadStep) -> None:
+    latencies = step.latencies or [float('nan')]
+    print(f"{step.rate:>10.0f} {step.achieved_rate:>10.0f} {step.pings:>7} {step.lost_pongs:>6} {percentile(latencies, 50) * 1e3:>8.2f} "
+          f"{percentile(latencies, 99) * 1e3:>8.2f} {max(latencies) * 1e3:>8.2f} {step.broadcasts_received:>10}")
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for item in value.split(','):
+        action, _, weight = item.partition('=')
+        if action not in ACTIONS:
+            raise argparse.ArgumentTypeError(f"Unknown action {action}, expected one of {', '.join(ACTIONS)}")
+        mix[action] = float(weight)
+    return mix
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Simulates many nodes and estimators to measure the capacity of the server')
+    parser.add_argument('--host', type=str, default="localhost", help='Host address of the server')
+    parser.add_argument('--port', type=int, default=8000, help='Port number of the server')
+    parser.add_argument('--nodes', type=int, default=1000, help='Number of simulated nodes, each on its own connection')
+    parser.add_argument('--rate', type=float, default=1000, help='Total messages per second over all nodes, or the first rate with --ramp')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('channel_switch=0.6,new_estimation=0.39,broadcast=0.01'),
+                        help='Relative weights of the actions, e.g. channel_switch=0.6,new_estimation=0.39,broadcast=0.01')
+    parser.add_argument('--channels', type=int, default=len(CHANNELS), help='Number of channels per estimation')
+    parser.add_argument('--ping-every', type=int, default=10, help='Number of messages between latency pings, over all nodes')
+    parser.add_argument('--duration', type=float, default=10, help='Duration of each run in seconds')
+    parser.add_argument('--ramp', action='store_true', help='Double the rate until the server cannot sustain it')
+    parser.add_argument('--max-latency', type=float, default=0.1, help='p99 ping latency above which a rate is not sustained, in seconds')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the random generators')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    generator = LoadGenerator(args.host, args.port, args.nodes, args.mix, args.ping_every, args.channels, args.seed)
+
+    print(f"{'target/s':>10} {'sent/s':>10} {'pings':>7} {'lost':>6} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'broadcasts':>10}")
+    rate = args.rate
+    sustained: Optional[LoadStep] = None
+    while True:
+        step = asyncio.run(generator.run(rate, args.duration))
+        report(step)
+        ok = step.achieved_rate >= 0.95 * rate and step.lost_pongs == 0 and step.p99() <= args.max_latency
+        if ok:
+            sustained = step
+        if not args.ramp or not ok:
+            break
+        rate *= 2
+
+    if args.ramp:
+        if sustained is None:
+            print(f"No rate sustained, starting at {args.rate:.0f} messages/s")
+        else:
+            print(f"Maximum sustained rate: {sustained.achieved_rate:.0f} messages/s, p99 latency {sustained.p99() * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
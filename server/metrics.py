@@ -0,0 +1,304 @@
+"""
+Counters, histograms and gauges of the server, cheap enough to stay on in production.
+
+Every thread records into its own shard, so recording takes no lock: a counter increment is a dict update and a
+histogram observation is a bucket increment. Shards are only merged when the metrics are read, by a stats request or
+the periodic dump.
+"""
+
+import argparse
+import json
+import logging
+import math
+import socket
+import threading
+import time
+from math import frexp
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TypeVar
+
+from protocol import FrameDecoder, encode_message
+
+logging.basicConfig(level=logging.INFO)
+
+# Histogram buckets split every power of two in SUB_BUCKETS, from 2^-MIN_EXPONENT up, i.e. from about 1 ns
+SUB_BUCKETS = 4
+MIN_EXPONENT = 30
+NUM_BUCKETS = (MIN_EXPONENT + 12) * SUB_BUCKETS
+
+T = TypeVar("T")
+
+
+class Histogram:
+    def __init__(self):
+        """
+        Initializes the Histogram object, a log-linear histogram with a relative error below 1 / (2 * SUB_BUCKETS).
+        """
+        self.counts: List[int] = [0] * NUM_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        if value <= 0:
+            # frexp(0.0) has a zero exponent, which would put the zero durations of coarse clocks in a bucket around 0.3 s
+            index = 0
+        else:
+            mantissa, exponent = frexp(value)
+            index = (exponent + MIN_EXPONENT) * SUB_BUCKETS + int((mantissa - 0.5) * (2 * SUB_BUCKETS))
+        if index < 0:
+            index = 0
+        elif index >= NUM_BUCKETS:
+            index = NUM_BUCKETS - 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: "Histogram") -> None:
+        counts = list(other.counts)
+        for index, count in enumerate(counts):
+            if count:
+                self.counts[index] += count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    @staticmethod
+    def upper_bound(index: int) -> float:
+        exponent, sub_bucket = divmod(index, SUB_BUCKETS)
+        return math.ldexp(0.5 + (sub_bucket + 1) / (2 * SUB_BUCKETS), exponent - MIN_EXPONENT)
+
+    def percentile(self, q: float) -> float:
+        """
+        Estimates a percentile from the buckets.
+
+        :param q: The percentile, between 0 and 100.
+        :return: The upper bound of the bucket holding the percentile, at most the maximum observed value.
+        """
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(q / 100 * self.count))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.upper_bound(index), self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'max': self.max,
+        }
+
+
+class MetricsShard:
+    def __init__(self, thread: Optional[threading.Thread] = None):
+        """
+        Initializes the MetricsShard object, the metrics recorded by a single thread.
+
+        :param thread: The thread owning the shard.
+        """
+        self.thread = thread
+        self.counters: Dict[str, float] = {}
+        self.histograms: Dict[str, Histogram] = {}
+
+    def merge(self, other: "MetricsShard") -> None:
+        for name, value in dict(other.counters).items():
+            self.counters[name] = self.counters.get(name, 0) + value
+        for name, histogram in dict(other.histograms).items():
+            self.histograms.setdefault(name, Histogram()).merge(histogram)
+
+
+class Metrics:
+    __instance = None
+
+    def __init__(self):
+        """
+        Initializes the Metrics object, the registry of the metrics of the server.
+        """
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.shards: List[MetricsShard] = []
+        self.retired = MetricsShard()
+        self.gauges: Dict[str, Callable[[], float]] = {}
+        self.started = time.time()
+
+    @staticmethod
+    def get_instance() -> "Metrics":
+        """
+        Returns a singleton instance of the metrics.
+
+        :return: The metrics.
+        """
+        if Metrics.__instance is None:
+            Metrics.__instance = Metrics()
+        return Metrics.__instance
+
+    def shard(self) -> MetricsShard:
+        """
+        Returns the shard of the calling thread, creating it on first use.
+
+        :return: The shard of the calling thread.
+        """
+        try:
+            return self.local.shard
+        except AttributeError:
+            shard = MetricsShard(threading.current_thread())
+            with self.lock:
+                self.shards.append(shard)
+            self.local.shard = shard
+            return shard
+
+    def increment(self, name: str, value: float = 1) -> None:
+        counters = self.shard().counters
+        counters[name] = counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float) -> None:
+        histograms = self.shard().histograms
+        histogram = histograms.get(name)
+        if histogram is None:
+            histogram = histograms[name] = Histogram()
+        histogram.observe(value)
+
+    def timed(self, name: str, iterator: Iterable[T]) -> Iterator[T]:
+        """
+        Yields the items of an iterator, observing the time taken to produce each of them.
+
+        :param name: The name of the histogram.
+        :param iterator: The iterator, e.g. the messages of a FrameDecoder.
+        :return: The items of the iterator.
+        """
+        iterator = iter(iterator)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            self.observe(name, time.perf_counter() - start)
+            yield item
+
+    def register_gauge(self, name: str, read: Callable[[], float]) -> None:
+        """
+        Registers a value read when the metrics are read, e.g. the number of connected clients.
+
+        :param name: The name of the gauge.
+        :param read: Returns the current value.
+        """
+        self.gauges[name] = read
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Merges the shards of all threads.
+
+        :return: The uptime in seconds, the counters with their average rate per second, the gauges and a summary of
+            every histogram, in seconds.
+        """
+        with self.lock:
+            # Shards of finished threads are folded into a single one, so that client churn does not grow the registry
+            alive = []
+            for shard in self.shards:
+                if shard.thread is not None and not shard.thread.is_alive():
+                    self.retired.merge(shard)
+                else:
+                    alive.append(shard)
+            self.shards = alive
+
+            merged = MetricsShard()
+            merged.merge(self.retired)
+            for shard in alive:
+                merged.merge(shard)
+
+        uptime = time.time() - self.started
+        gauges = {}
+        for name, read in list(self.gauges.items()):
+            try:
+                gauges[name] = read()
+            except Exception:
+                logging.warning("Failed to read gauge %s", name, exc_info=True)
+        return {
+            'time': time.time(),
+            'uptime': uptime,
+            'counters': merged.counters,
+            'rates': {name: value / uptime for name, value in merged.counters.items()} if uptime > 0 else {},
+            'gauges': gauges,
+            'histograms': {name: histogram.summary() for name, histogram in merged.histograms.items()},
+        }
+
+
+class MetricsDumper(threading.Thread):
+    def __init__(self, path: str, interval: float = 10.0):
+        """
+        Initializes the MetricsDumper object, appending a snapshot of the metrics to a file every interval seconds,
+        one JSON object per line, with the rates of the counters over the interval.
+
+        :param path: The path of the file.
+        :param interval: The interval between snapshots, in seconds.
+        """
+        threading.Thread.__init__(self, daemon=True)
+        self.path = path
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.previous: Optional[Dict[str, Any]] = None
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            self.dump()
+
+    def dump(self) -> None:
+        snapshot = Metrics.get_instance().snapshot()
+        if self.previous is not None:
+            elapsed = snapshot['time'] - self.previous['time']
+            previous = self.previous['counters']
+            snapshot['interval_rates'] = {name: (value - previous.get(name, 0)) / elapsed for name, value in snapshot['counters'].items()}
+        self.previous = snapshot
+        try:
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(snapshot) + '\n')
+        except OSError:
+            logging.error("Failed to write metrics to %s", self.path, exc_info=True)
+
+    def stop(self) -> None:
+        """
+        Writes a last snapshot and stops the MetricsDumper thread.
+        """
+        self.stopped.set()
+        self.join()
+        self.dump()
+
+
+def query_stats(host: str, port: int, timeout: float = 5.0) -> Dict[str, Any]:
+    """
+    Requests the metrics of a running server with the stats action.
+
+    :param host: The host address of the server.
+    :param port: The port number of the server.
+    :param timeout: The timeout of the request, in seconds.
+    :return: The snapshot of the metrics of the server.
+    """
+    with socket.create_connection((host, port), timeout=timeout) as s:
+        s.sendall(encode_message({'action': 'stats'}))
+        decoder = FrameDecoder()
+        while decoder.recv_from(s):
+            for message in decoder.messages():
+                if message.get('action') == 'stats':
+                    return message['stats']
+    raise ConnectionError("Connection closed before the stats reply")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Prints the metrics of a running server')
+    parser.add_argument('--host', type=str, default="40.40.40.5", help='Host address of the server')
+    parser.add_argument('--port', type=int, default=8000, help='Port number of the server')
+    args = parser.parse_args()
+    print(json.dumps(query_stats(args.host, args.port), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+Framing of the socket protocol shared by the server and its clients.
+
+Every message is sent as a frame made of a 5 byte header, holding the payload length (uint32, network byte order) and the
+payload type (uint8), followed by the payload itself. Framing makes the protocol independent of how TCP splits or
+coalesces the byte stream, so a single recv may carry many messages and a large message may span many recvs.
+
+Payloads are JSON by default. A connection may negotiate the binary encoding of new_estimation messages with a hello
+message, in which case channels and qualities are sent as packed uint16 and float32 arrays.
+"""
+
+import json
+import socket
+import struct
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+HEADER = struct.Struct('!IB')
+FRAME_JSON = 0
+FRAME_ESTIMATION = 1
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+
+ENCODING_JSON = 'json'
+ENCODING_BINARY = 'binary'
+SUPPORTED_ENCODINGS = (ENCODING_BINARY, ENCODING_JSON)
+
+ESTIMATION_COUNT = struct.Struct('!H')
+
+
+class FrameError(ValueError):
+    """
+    Raised when the byte stream does not hold a valid frame.
+    """
+
+
+def encode_frame(payload: bytes, kind: int = FRAME_JSON) -> bytes:
+    """
+    Prepends the frame header to a payload.
+
+    :param payload: The payload to frame.
+    :param kind: The payload type.
+    :return: The framed payload, ready to be sent.
+    """
+    return HEADER.pack(len(payload), kind) + payload
+
+
+def encode_message(message: Dict[str, Any]) -> bytes:
+    """
+    Encodes a message as a JSON frame.
+
+    :param message: The message to encode.
+    :return: The framed message, ready to be sent.
+    """
+    return encode_frame(json.dumps(message).encode())
+
+
+@lru_cache(maxsize=64)
+def estimation_struct(count: int) -> struct.Struct:
+    """
+    Returns the layout of the arrays of a binary new_estimation payload.
+
+    :param count: The number of channels in the estimation.
+    :return: The struct packing count uint16 channels followed by count float32 qualities.
+    """
+    return struct.Struct(f'!{count}H{count}f')
+
+
+def encode_estimation(channel_quality: Sequence[float], channels: Sequence[int], encoding: str = ENCODING_JSON) -> bytes:
+    """
+    Encodes a new_estimation message with the given encoding.
+
+    :param channel_quality: A list of channel quality values.
+    :param channels: A list of channel indices corresponding to the quality values.
+    :param encoding: The encoding negotiated for the connection.
+    :return: The framed message, ready to be sent.
+    """
+    if encoding != ENCODING_BINARY:
+        return encode_message({'action': 'new_estimation', 'channel_quality': list(channel_quality), 'channels': list(channels)})
+
+    count = len(channels)
+    payload = ESTIMATION_COUNT.pack(count) + estimation_struct(count).pack(*channels, *channel_quality)
+    return encode_frame(payload, FRAME_ESTIMATION)
+
+
+def decode_estimation(payload: memoryview) -> Dict[str, Any]:
+    """
+    Decodes a binary new_estimation payload.
+
+    :param payload: The payload of the frame.
+    :return: The decoded message, with the same fields as its JSON counterpart.
+    """
+    if len(payload) < ESTIMATION_COUNT.size:
+        raise FrameError("Estimation frame is missing its channel count")
+    count, = ESTIMATION_COUNT.unpack_from(payload)
+    layout = estimation_struct(count)
+    if len(payload) != ESTIMATION_COUNT.size + layout.size:
+        raise FrameError(f"Estimation frame of {len(payload)} bytes does not hold {count} channels")
+    values = layout.unpack_from(payload, ESTIMATION_COUNT.size)
+    return {'action': 'new_estimation', 'channels': values[:count], 'channel_quality': values[count:]}
+
+
+def decode_message(kind: int, payload: memoryview) -> Dict[str, Any]:
+    """
+    Decodes the payload of a frame into a message.
+
+    :param kind: The payload type.
+    :param payload: The payload of the frame.
+    :return: The decoded message.
+    """
+    if kind == FRAME_JSON:
+        return json.loads(str(payload, 'utf-8'))
+    if kind == FRAME_ESTIMATION:
+        return decode_estimation(payload)
+    raise FrameError(f"Unknown frame type {kind}")
+
+
+def hello_message(encodings: Sequence[str] = SUPPORTED_ENCODINGS) -> Dict[str, Any]:
+    """
+    Builds the message a client sends to offer encodings to the server, in order of preference.
+
+    :param encodings: The encodings supported by the client.
+    :return: The hello message.
+    """
+    return {'action': 'hello', 'encodings': list(encodings)}
+
+
+def negotiate_encoding(offered: List[str]) -> str:
+    """
+    Picks the encoding of a connection among the ones offered by the client, falling back to JSON.
+
+    :param offered: The encodings offered by the client, in order of preference.
+    :return: The encoding of the connection.
+    """
+    for encoding in offered:
+        if encoding in SUPPORTED_ENCODINGS:
+            return encoding
+    return ENCODING_JSON
+
+
+class FrameDecoder:
+    def __init__(self, buffer_size: int = 65536, min_recv_size: int = 4096, max_frame_size: int = MAX_FRAME_SIZE,
+                 on_frame: Optional[Callable[[int, memoryview], None]] = None):
+        """
+        Initializes the FrameDecoder object, an incremental decoder over a reusable receive buffer.
+
+        Received bytes are written in place into the buffer and frames are handed out as memoryview slices of it, so no
+        bytes are copied until a payload is decoded. A slice is only valid until the next call to recv_from or feed.
+
+        :param buffer_size: The initial size of the receive buffer. The buffer grows to fit larger frames.
+        :param min_recv_size: The minimum free space to make available before each recv.
+        :param max_frame_size: The maximum accepted payload size.
+        :param on_frame: Called with the payload type and payload of every frame handed out by messages, e.g. to record it.
+        """
+        self.buffer = bytearray(buffer_size)
+        self.view = memoryview(self.buffer)
+        self.start = 0
+        self.end = 0
+        self.min_recv_size = min_recv_size
+        self.max_frame_size = max_frame_size
+        self.accepted_kinds = {FRAME_JSON}
+        self.on_frame = on_frame
+
+    def set_encoding(self, encoding: str) -> None:
+        """
+        Sets which payload types are accepted, once the encoding of the connection has been negotiated.
+
+        :param encoding: The encoding of the connection.
+        """
+        self.accepted_kinds = {FRAME_JSON, FRAME_ESTIMATION} if encoding == ENCODING_BINARY else {FRAME_JSON}
+
+    def recv_from(self, sock: socket.socket) -> int:
+        """
+        Receives bytes from a socket directly into the buffer.
+
+        :param sock: The socket to receive from.
+        :return: The number of bytes received, 0 once the connection is closed.
+        """
+        self.reserve(self.min_recv_size)
+        received = sock.recv_into(self.view[self.end:])
+        self.end += received
+        return received
+
+    def feed(self, data: bytes) -> None:
+        """
+        Appends already received bytes to the buffer.
+
+        :param data: The received bytes.
+        """
+        self.reserve(len(data))
+        self.view[self.end:self.end + len(data)] = data
+        self.end += len(data)
+
+    def frames(self) -> Iterator[Tuple[int, memoryview]]:
+        """
+        Yields every complete frame in the buffer.
+
+        :return: An iterator of (payload type, payload) pairs.
+        """
+        while self.end - self.start >= HEADER.size:
+            length, kind = HEADER.unpack_from(self.buffer, self.start)
+            if length > self.max_frame_size:
+                raise FrameError(f"Frame of {length} bytes exceeds the maximum of {self.max_frame_size} bytes")
+            frame_end = self.start + HEADER.size + length
+            if frame_end > self.end:
+                break
+            payload = self.view[self.start + HEADER.size:frame_end]
+            self.start = frame_end
+            yield kind, payload
+
+        if self.start == self.end:
+            self.start = self.end = 0
+
+    def messages(self) -> Iterator[Dict[str, Any]]:
+        """
+        Yields every complete message in the buffer.
+
+        :return: An iterator of decoded messages.
+        """
+        for kind, payload in self.frames():
+            if self.on_frame is not None:
+                self.on_frame(kind, payload)
+            if kind not in self.accepted_kinds:
+                raise FrameError(f"Frame type {kind} was not negotiated for this connection")
+            yield decode_message(kind, payload)
+
+    def reserve(self, size: int) -> None:
+        """
+        Makes sure that at least size bytes are free at the end of the buffer, first by moving the pending partial frame
+        to the front of the buffer and, if that is not enough, by growing the buffer.
+
+        :param size: The number of free bytes required.
+        """
+        if len(self.buffer) - self.end >= size:
+            return
+
+        pending = self.end - self.start
+        if pending + size <= len(self.buffer):
+            self.buffer[:pending] = self.buffer[self.start:self.end]
+        else:
+            buffer = bytearray(max(2 * len(self.buffer), pending + size))
+            buffer[:pending] = self.view[self.start:self.end]
+            self.buffer = buffer
+            self.view = memoryview(buffer)
+        self.start = 0
+        self.end = pending
@@ -0,0 +1,213 @@
+"""
+Radio backends of the channel switch.
+
+A switch goes through the steps in STEPS: the interface is taken down, wpa_supplicant is stopped, its configuration is
+rendered for the new frequency, wpa_supplicant is started again and the mesh link comes up. ShellRadio drives the real
+interface, SimulatedRadio takes a configurable time per step, so switching can be profiled on any Linux box.
+"""
+
+import os
+import random
+import re
+import subprocess
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+
+INTERFACE_DOWN = "interface_down"
+SUPPLICANT_KILL = "supplicant_kill"
+CONFIG_RENDER = "config_render"
+SUPPLICANT_START = "supplicant_start"
+LINK_UP = "link_up"
+STEPS = (INTERFACE_DOWN, SUPPLICANT_KILL, CONFIG_RENDER, SUPPLICANT_START, LINK_UP)
+
+WPA_SUPPLICANT_CONF = '/var/run/wpa_supplicant-11s.conf'
+
+T = TypeVar("T")
+
+
+class SwitchProfile:
+    def __init__(self, frequency: int):
+        """
+        Initializes the SwitchProfile object, the time taken by each step of a channel switch.
+
+        :param frequency: The frequency switched to.
+        """
+        self.frequency = frequency
+        self.steps: Dict[str, float] = {}
+        self.confirmed = True
+
+    def timed(self, step: str, action: Callable[..., T], *args) -> T:
+        """
+        Runs a step of the switch and records its duration.
+
+        :param step: The name of the step, one of STEPS.
+        :param action: The step.
+        :param args: The arguments of the step.
+        :return: The result of the step.
+        """
+        start = time.perf_counter()
+        try:
+            return action(*args)
+        finally:
+            self.steps[step] = self.steps.get(step, 0.0) + time.perf_counter() - start
+
+    @property
+    def total(self) -> float:
+        return sum(self.steps.values())
+
+    def report(self) -> str:
+        steps = ", ".join(f"{step} {duration * 1e3:.0f} ms" for step, duration in self.steps.items())
+        return f"Switched to {self.frequency} MHz in {self.total:.2f} s ({steps})" + ("" if self.confirmed else ", without confirmation from the radio")
+
+
+class RadioBackend(ABC):
+    """
+    The steps of a channel switch. The readiness checks are polled by the caller, so a step returns as soon as its
+    command is issued.
+    """
+
+    @abstractmethod
+    def interface_down(self) -> None:
+        pass
+
+    @abstractmethod
+    def kill_supplicant(self) -> None:
+        pass
+
+    @abstractmethod
+    def is_down(self) -> bool:
+        """
+        :return: Whether wpa_supplicant exited and the interface is down.
+        """
+
+    @abstractmethod
+    def render_config(self, freq: int) -> None:
+        pass
+
+    @abstractmethod
+    def start_supplicant(self) -> None:
+        pass
+
+    @abstractmethod
+    def is_on_frequency(self, freq: int) -> bool:
+        """
+        :param freq: The frequency switched to.
+        :return: Whether the interface operates on the frequency.
+        """
+
+
+class ShellRadio(RadioBackend):
+    def __init__(self, interface: str = 'wlp1s0', conf_path: str = WPA_SUPPLICANT_CONF):
+        """
+        Initializes the ShellRadio object, switching a wireless interface with ifconfig, wpa_supplicant and iw.
+
+        The configuration of wpa_supplicant is read once, on the first switch, and used as the template of the
+        configurations written on every switch after that.
+
+        :param interface: The wireless interface.
+        :param conf_path: The path of the wpa_supplicant configuration.
+        """
+        self.interface = interface
+        self.conf_path = conf_path
+        self.template: Optional[Tuple[str, str]] = None
+        self.configs: Dict[int, str] = {}
+
+    def interface_down(self) -> None:
+        subprocess.run(['ifconfig', self.interface, '0'])
+        subprocess.run(['ifconfig', self.interface, 'down'])
+
+    def kill_supplicant(self) -> None:
+        subprocess.run(['killall', 'wpa_supplicant'])
+
+    def is_down(self) -> bool:
+        if subprocess.run(['pidof', 'wpa_supplicant'], stdout=subprocess.DEVNULL).returncode == 0:
+            return False
+        try:
+            with open(f'/sys/class/net/{self.interface}/operstate') as f:
+                return f.read().strip() == 'down'
+        except OSError:
+            return True
+
+    def render_config(self, freq: int) -> None:
+        config = self.configs.get(freq)
+        if config is None:
+            if self.template is None:
+                with open(self.conf_path, 'r') as f:
+                    conf = re.sub(r'country=\d+', 'country=US', f.read())
+                match = re.search(r'frequency=\d+', conf)
+                if match is None:
+                    raise ValueError(f"No frequency in {self.conf_path}")
+                self.template = conf[:match.start()], conf[match.end():]
+            prefix, suffix = self.template
+            config = self.configs[freq] = f'{prefix}frequency={freq}{suffix}'
+
+        with open(self.conf_path, 'w') as f:
+            f.write(config)
+
+    def start_supplicant(self) -> None:
+        # The control socket of a killed wpa_supplicant prevents a new one from starting
+        filename = f'/var/run/wpa_supplicant/{self.interface}'
+        if os.path.exists(filename):
+            os.remove(filename)
+            print(f"{filename} deleted")
+        subprocess.run(['wpa_supplicant', '-Dnl80211', f'-i{self.interface}', '-c', self.conf_path, '-B'])
+
+    def is_on_frequency(self, freq: int) -> bool:
+        result = subprocess.run(['iw', 'dev', self.interface, 'info'], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        return result.returncode == 0 and f'({freq} MHz)' in result.stdout
+
+
+# Seconds taken by each step of the simulated radio. A killed wpa_supplicant exits, and a started one joins the mesh,
+# in the background, these are the delays before is_down and is_on_frequency pass
+DEFAULT_LATENCIES = {
+    INTERFACE_DOWN: 0.02,
+    SUPPLICANT_KILL: 0.2,
+    CONFIG_RENDER: 0.001,
+    SUPPLICANT_START: 0.05,
+    LINK_UP: 1.5,
+}
+
+
+class SimulatedRadio(RadioBackend):
+    def __init__(self, latencies: Optional[Dict[str, float]] = None, jitter: float = 0.0, seed: int = 0):
+        """
+        Initializes the SimulatedRadio object, a radio without hardware taking a given time per step.
+
+        :param latencies: The seconds taken by each step, DEFAULT_LATENCIES for the missing ones.
+        :param jitter: The relative random variation of the latencies, e.g. 0.2 for +/-20%.
+        :param seed: The seed of the random generator of the jitter.
+        """
+        self.latencies = dict(DEFAULT_LATENCIES, **(latencies or {}))
+        self.jitter = jitter
+        self.random = random.Random(seed)
+        self.down_at = 0.0
+        self.config: Optional[int] = None
+        self.frequency: Optional[int] = None
+        self.up_at = float('inf')
+
+    def latency(self, step: str) -> float:
+        return self.latencies[step] * self.random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def interface_down(self) -> None:
+        time.sleep(self.latency(INTERFACE_DOWN))
+        self.frequency = None
+        self.up_at = float('inf')
+
+    def kill_supplicant(self) -> None:
+        self.down_at = time.monotonic() + self.latency(SUPPLICANT_KILL)
+
+    def is_down(self) -> bool:
+        return time.monotonic() >= self.down_at
+
+    def render_config(self, freq: int) -> None:
+        time.sleep(self.latency(CONFIG_RENDER))
+        self.config = freq
+
+    def start_supplicant(self) -> None:
+        time.sleep(self.latency(SUPPLICANT_START))
+        self.frequency = self.config
+        self.up_at = time.monotonic() + self.latency(LINK_UP)
+
+    def is_on_frequency(self, freq: int) -> bool:
+        return self.frequency == freq and time.monotonic() >= self.up_at
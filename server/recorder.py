@@ -0,0 +1,151 @@
+"""
+Append-only recording of the frames received by the server.
+
+A recording starts with a magic string followed by one record per received frame: a record header, holding the
+reception time (float64, seconds since the epoch) and the connection number (uint32), both in network byte order,
+followed by the frame exactly as it was received, with its own header. Frames are stored verbatim, so JSON and binary
+payloads are both replayed byte for byte.
+"""
+
+import itertools
+import logging
+import mmap
+import struct
+import threading
+import time
+from typing import Iterator, Tuple
+
+from protocol import HEADER, FrameError
+
+logging.basicConfig(level=logging.INFO)
+
+MAGIC = b'JAMREC1\n'
+RECORD = struct.Struct('!dI')
+
+
+class Recorder:
+    def __init__(self, path: str, flush_interval: float = 1.0):
+        """
+        Initializes the Recorder object, appending every frame received by the server to a log file.
+
+        Frames of all connections go through a single buffered file, flushed every flush_interval seconds by a
+        background thread, so that records reach the file even when no frame follows them.
+
+        :param path: The path of the log file. Records are appended if it already exists, numbering connections after
+            the ones already recorded so that the replay keeps the clients of every session apart.
+        :param flush_interval: The maximum time records stay in the write buffer, in seconds.
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.file = open(path, 'ab', buffering=1024 * 1024)
+        if self.file.tell() == 0:
+            self.file.write(MAGIC)
+            first_connection = 0
+        else:
+            last, end = scan_records(path)
+            if end < self.file.tell():
+                # Records are appended after the last complete one, a record cut short would swallow them otherwise
+                self.file.truncate(end)
+                self.file.seek(end)
+            first_connection = last + 1
+        self.connections = itertools.count(first_connection)
+        self.records = 0
+        self.unflushed = False
+        self.stopped = threading.Event()
+        self.flusher = threading.Thread(target=self.flush_periodically, daemon=True)
+        self.flusher.start()
+
+    def open_connection(self) -> int:
+        """
+        Numbers a new connection, so that the frames of each connection are replayed on a connection of their own.
+
+        :return: The connection number.
+        """
+        return next(self.connections)
+
+    def record(self, connection: int, kind: int, payload: memoryview) -> None:
+        """
+        Appends a received frame to the log.
+
+        :param connection: The connection number.
+        :param kind: The payload type of the frame.
+        :param payload: The payload of the frame.
+        """
+        header = RECORD.pack(time.time(), connection) + HEADER.pack(len(payload), kind)
+        with self.lock:
+            if self.file.closed:
+                return
+            self.file.write(header)
+            self.file.write(payload)
+            self.records += 1
+            self.unflushed = True
+
+    def flush_periodically(self) -> None:
+        """
+        Flushes the records written since the last flush, every flush_interval seconds until closed.
+        """
+        while not self.stopped.wait(self.flush_interval):
+            with self.lock:
+                if self.unflushed and not self.file.closed:
+                    self.file.flush()
+                    self.unflushed = False
+
+    def close(self) -> None:
+        """
+        Flushes and closes the log file.
+        """
+        self.stopped.set()
+        with self.lock:
+            if not self.file.closed:
+                self.file.close()
+                logging.info("Recorded %d frames to %s", self.records, self.path)
+
+
+def scan_records(path: str) -> Tuple[int, int]:
+    """
+    Finds where a recording ends.
+
+    :param path: The path of the log file.
+    :return: The highest connection number, -1 if there is no record, and the offset after the last complete record.
+    """
+    last = -1
+    end = len(MAGIC)
+    for _, connection, frame in read_records(path):
+        last = max(last, connection)
+        end += RECORD.size + len(frame)
+    return last, end
+
+
+def read_records(path: str) -> Iterator[Tuple[float, int, memoryview]]:
+    """
+    Reads a recording through a memory map, without copying the frames.
+
+    :param path: The path of the log file.
+    :return: An iterator of (reception time, connection number, frame) records. The frames are slices of the memory
+        map, only valid while the iterator is alive.
+    """
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        if data[:len(MAGIC)] != MAGIC:
+            raise FrameError(f"{path} is not a recording")
+        view = memoryview(data)
+        try:
+            offset = len(MAGIC)
+            size = len(data)
+            while offset + RECORD.size + HEADER.size <= size:
+                timestamp, connection = RECORD.unpack_from(data, offset)
+                length, _ = HEADER.unpack_from(data, offset + RECORD.size)
+                frame_start = offset + RECORD.size
+                frame_end = frame_start + HEADER.size + length
+                if frame_end > size:
+                    # Last record cut short by a crash of the server
+                    logging.warning("Ignoring truncated record at offset %d", offset)
+                    break
+                frame = view[frame_start:frame_end]
+                try:
+                    yield timestamp, connection, frame
+                finally:
+                    frame.release()
+                offset = frame_end
+        finally:
+            view.release()
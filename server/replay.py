@@ -0,0 +1,147 @@
+import argparse
+import logging
+import selectors
+import socket
+import threading
+import time
+from typing import Dict, List, Set
+
+from recorder import read_records
+from writer import percentile
+
+logging.basicConfig(level=logging.INFO)
+
+
+class Replayer:
+    def __init__(self, path: str, host: str, port: int, speed: float = 1.0):
+        """
+        Initializes the Replayer object, re-sending a recording of the server traffic to a server.
+
+        Every recorded connection is replayed on a connection of its own, opened when its first frame is due, so the
+        server sees the same interleaving of clients as when it was recorded. A connection the server closes is not
+        opened again, the rest of its frames are skipped.
+
+        :param path: The path of the recording.
+        :param host: The host address of the server.
+        :param port: The port number of the server.
+        :param speed: The replay speed, 1 for real time, N for N times faster, 0 for as fast as possible.
+        """
+        self.path = path
+        self.host = host
+        self.port = port
+        self.speed = speed
+        self.sockets: Dict[int, socket.socket] = {}
+        self.selector = selectors.DefaultSelector()
+        self.selector_lock = threading.Lock()
+        self.running = True
+        self.frames = 0
+        self.bytes = 0
+        self.closed: Set[int] = set()
+        self.skipped = 0
+        self.lags: List[float] = []
+
+    def connection(self, number: int) -> socket.socket:
+        """
+        Returns the socket replaying a recorded connection, connecting it on first use.
+
+        :param number: The recorded connection number.
+        :return: The connected socket.
+        """
+        sock = self.sockets.get(number)
+        if sock is None:
+            sock = socket.create_connection((self.host, self.port))
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.sockets[number] = sock
+            with self.selector_lock:
+                self.selector.register(sock, selectors.EVENT_READ)
+        return sock
+
+    def drain(self) -> None:
+        """
+        Reads and discards what the server sends back, hello replies and broadcasts, so that it never waits on us.
+        """
+        while self.running:
+            with self.selector_lock:
+                events = self.selector.select(timeout=0.01) if self.selector.get_map() else []
+            for key, _ in events:
+                try:
+                    if not key.fileobj.recv(65536):
+                        with self.selector_lock:
+                            self.selector.unregister(key.fileobj)
+                except OSError:
+                    with self.selector_lock:
+                        self.selector.unregister(key.fileobj)
+            if not events:
+                time.sleep(0.001)
+
+    def run(self) -> float:
+        """
+        Replays the recording.
+
+        :return: The duration of the replay, in seconds.
+        """
+        drainer = threading.Thread(target=self.drain, daemon=True)
+        drainer.start()
+
+        start = time.perf_counter()
+        first = None
+        for timestamp, number, frame in read_records(self.path):
+            if first is None:
+                first = timestamp
+            if self.speed > 0:
+                due = start + (timestamp - first) / self.speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                self.lags.append(max(0.0, time.perf_counter() - due))
+
+            if number in self.closed:
+                self.skipped += 1
+                continue
+            try:
+                self.connection(number).sendall(frame)
+            except OSError as e:
+                logging.warning("Recorded connection %d closed by the server (%s), skipping its remaining frames", number, e)
+                self.closed.add(number)
+                self.skipped += 1
+                continue
+            self.frames += 1
+            self.bytes += len(frame)
+        elapsed = time.perf_counter() - start
+
+        self.running = False
+        drainer.join()
+        for sock in self.sockets.values():
+            sock.close()
+        return elapsed
+
+
+def parse_speed(value: str) -> float:
+    if value == 'max':
+        return 0.0
+    return float(value.rstrip('x'))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Replays a recording of the server traffic made with server.py --record')
+    parser.add_argument('recording', type=str, help='Path of the recording')
+    parser.add_argument('--host', type=str, default="40.40.40.5", help='Host address of the server')
+    parser.add_argument('--port', type=int, default=8000, help='Port number of the server')
+    parser.add_argument('--speed', type=parse_speed, default=1.0, help='Replay speed: 1x for real time, Nx for N times faster, max for as fast as possible')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    replayer = Replayer(args.recording, args.host, args.port, args.speed)
+    elapsed = replayer.run()
+    logging.info("Replayed %d frames, %d bytes on %d connections in %.2f s, %.0f frames/s", replayer.frames, replayer.bytes,
+                 len(replayer.sockets), elapsed, replayer.frames / elapsed if elapsed else 0)
+    if replayer.skipped:
+        logging.warning("Skipped %d frames of %d connections closed by the server", replayer.skipped, len(replayer.closed))
+    if replayer.lags:
+        logging.info("Lag behind schedule: p99 %.2f ms, max %.2f ms", percentile(replayer.lags, 99) * 1e3, max(replayer.lags) * 1e3)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+"""
+Synthetic jamming scenarios, to drive the server and the UI without a live estimator.
+
+A scenario places nodes and jammers in a unit square. Every jammer occupies a position in the band that is static,
+sweeps across the channels or hops between them, moves across the square, and degrades the channels around its
+position in the band for the nodes within its radius. The channel qualities of all nodes at all time steps are computed
+in one vectorised pass, as a (time, node, channel) tensor.
+"""
+
+import argparse
+import logging
+import math
+import socket
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+
+CHANNELS = [36, 40, 44, 48, 52, 56, 60, 64, 149, 153, 157, 161, 165]
+JAMMER_MODES = ("static", "sweep", "hop")
+
+# Resolution of the precomputed spectral kernels, in samples per channel
+KERNEL_OVERSAMPLING = 16
+
+
+class Jammer:
+    def __init__(self, mode: str = "sweep", channel: float = 0.0, rate: float = 0.1, every: int = 50, strength: float = 0.9,
+                 width: float = 1.0, radius: float = 0.6, speed: float = 0.005):
+        """
+        Initializes the Jammer object, the parameters of a jammer of a scenario.
+
+        :param mode: "static" to stay on its channel, "sweep" to sweep across the band, "hop" to jump between random
+            channels.
+        :param channel: The index of the first channel, from 0 up to the number of channels excluded, may be fractional.
+        :param rate: The channels swept per time step, negative to sweep down the band.
+        :param every: The time steps between hops, at least 1.
+        :param strength: The quality lost on the jammed channel, right next to the jammer, between 0 and 1.
+        :param width: The standard deviation of the jammed band, in channels, positive.
+        :param radius: The standard deviation of the jammed area, in units of the square, positive.
+        :param speed: The distance moved per time step, in units of the square.
+        """
+        if mode not in JAMMER_MODES:
+            raise ValueError(f"Unknown jammer mode {mode}, expected one of {', '.join(JAMMER_MODES)}")
+        if every < 1:
+            raise ValueError(f"Jammer every={every} out of range, expected at least 1 time step between hops")
+        if not math.isfinite(rate):
+            raise ValueError(f"Jammer rate={rate} out of range, expected a finite number of channels per time step")
+        if not width > 0 or not radius > 0:
+            raise ValueError(f"Jammer width={width} and radius={radius} out of range, expected positive values")
+        self.mode = mode
+        self.channel = channel
+        self.rate = rate
+        self.every = every
+        self.strength = strength
+        self.width = width
+        self.radius = radius
+        self.speed = speed
+
+    @staticmethod
+    def parse(value: str) -> "Jammer":
+        """
+        Parses a jammer from the command line, e.g. "sweep,rate=0.2" or "hop,every=20,strength=0.7".
+
+        :param value: The mode followed by comma separated parameters.
+        :return: The jammer.
+        """
+        mode, *items = value.split(',')
+        parameters: Dict[str, float] = {}
+        for item in items:
+            name, _, parameter = item.partition('=')
+            if name not in ("channel", "rate", "every", "strength", "width", "radius", "speed"):
+                raise argparse.ArgumentTypeError(f"Unknown jammer parameter {name}")
+            try:
+                parameters[name] = int(parameter) if name == "every" else float(parameter)
+            except ValueError:
+                raise argparse.ArgumentTypeError(f"Invalid value {parameter!r} of jammer parameter {name}")
+        try:
+            return Jammer(mode, **parameters)
+        except ValueError as e:
+            raise argparse.ArgumentTypeError(str(e))
+
+
+class Scenario:
+    def __init__(self, nodes: int, channels: int, jammers: Sequence[Jammer], noise: float = 0.05, seed: int = 0):
+        """
+        Initializes the Scenario object, placing the nodes and the jammers and precomputing the spectral kernel of
+        every jammer.
+
+        :param nodes: The number of nodes.
+        :param channels: The number of channels.
+        :param jammers: The jammers.
+        :param noise: The standard deviation of the estimation noise.
+        :param seed: The seed of the random generator, the same seed always generates the same scenario.
+        """
+        for jammer in jammers:
+            if not 0 <= jammer.channel < channels:
+                raise ValueError(f"Jammer channel {jammer.channel} out of range, expected an index from 0 up to {channels} excluded")
+        self.nodes = nodes
+        self.channels = channels
+        self.jammers = list(jammers)
+        self.noise = noise
+        self.rng = np.random.default_rng(seed)
+        self.positions = self.rng.random((nodes, 2))
+
+        # Kernel of every jammer sampled every 1 / KERNEL_OVERSAMPLING channel, over offsets spanning the whole band
+        offsets = np.arange(-channels * KERNEL_OVERSAMPLING, channels * KERNEL_OVERSAMPLING + 1) / KERNEL_OVERSAMPLING
+        widths = np.array([[jammer.width] for jammer in self.jammers])
+        strengths = np.array([[jammer.strength] for jammer in self.jammers])
+        self.kernels = (strengths * np.exp(-0.5 * (offsets / widths) ** 2)).astype(np.float32)
+
+    def band_positions(self, steps: int) -> np.ndarray:
+        """
+        Computes the position in the band of every jammer at every time step.
+
+        :param steps: The number of time steps.
+        :return: The fractional channel index of every jammer, as a (jammer, time) array.
+        """
+        t = np.arange(steps)
+        centers = np.empty((len(self.jammers), steps))
+        for j, jammer in enumerate(self.jammers):
+            if jammer.mode == "sweep":
+                centers[j] = (jammer.channel + jammer.rate * t) % self.channels
+            elif jammer.mode == "hop":
+                hops = self.rng.integers(0, self.channels, -(-steps // jammer.every))
+                hops[0] = int(jammer.channel)
+                centers[j] = np.repeat(hops, jammer.every)[:steps]
+            else:
+                centers[j] = jammer.channel
+        return centers
+
+    def area_positions(self, steps: int) -> np.ndarray:
+        """
+        Computes the position in the square of every jammer at every time step, each moving in a straight line from a
+        random start in a random direction and bouncing off the sides.
+
+        :param steps: The number of time steps.
+        :return: The positions, as a (jammer, time, 2) array.
+        """
+        starts = self.rng.random((len(self.jammers), 2))
+        angles = self.rng.random(len(self.jammers)) * 2 * np.pi
+        speeds = np.array([jammer.speed for jammer in self.jammers])
+        velocities = speeds[:, None] * np.stack([np.cos(angles), np.sin(angles)], axis=1)
+        unfolded = (starts[:, None, :] + velocities[:, None, :] * np.arange(steps)[None, :, None]) % 2
+        return np.where(unfolded > 1, 2 - unfolded, unfolded)
+
+    def generate(self, steps: int) -> np.ndarray:
+        """
+        Generates the channel qualities of all nodes at all time steps.
+
+        :param steps: The number of time steps.
+        :return: The qualities between 0 and 1, as a float32 (time, node, channel) array.
+        """
+        # Spectral footprint of every jammer at every step, looked up in its kernel: (jammer, time, channel)
+        centers = self.band_positions(steps)
+        offsets = np.arange(self.channels)[None, None, :] - centers[:, :, None]
+        indices = np.rint((offsets + self.channels) * KERNEL_OVERSAMPLING).astype(np.intp)
+        footprints = self.kernels[np.arange(len(self.jammers))[:, None, None], indices]
+
+        # Attenuation of every jammer at every node at every step: (jammer, time, node)
+        jammers = self.area_positions(steps).astype(np.float32)
+        positions = self.positions.astype(np.float32)
+        distances = np.square(jammers[:, :, None, 0] - positions[:, 0])
+        distances += np.square(jammers[:, :, None, 1] - positions[:, 1])
+        radii = np.array([jammer.radius for jammer in self.jammers], dtype=np.float32)[:, None, None]
+        attenuations = np.exp(distances * (-0.5 / radii ** 2))
+
+        # Sum over jammers as a matrix product per time step: (time, node, jammer) @ (time, jammer, channel)
+        quality = np.matmul(attenuations.transpose(1, 2, 0), footprints.transpose(1, 0, 2))
+        np.subtract(1.0, quality, out=quality)
+        if self.noise > 0:
+            noise = self.rng.standard_normal(quality.shape, dtype=np.float32)
+            noise *= self.noise
+            quality += noise
+        return np.clip(quality, 0.0, 1.0, out=quality)
+
+
+class ScenarioStreamer:
+    def __init__(self, host: str, port: int, channels: Sequence[int], per_node: bool = False):
+        """
+        Initializes the ScenarioStreamer object, sending the qualities of a scenario to the server as new_estimation
+        messages.
+
+        :param host: The host address of the server.
+        :param port: The port number of the server.
+        :param channels: The channel numbers of the estimations.
+        :param per_node: Whether every node sends its own estimations on its own connection, for load tests, instead
+            of a single estimator sending the mean over all nodes.
+        """
+        self.host = host
+        self.port = port
+        self.channels = list(channels)
+        self.per_node = per_node
+        self.sockets: List[socket.socket] = []
+        self.encodings: List[str] = []
+        self.sent = 0
+
+    def connect(self, count: int) -> None:
+        """
+        Opens the connections and offers the binary estimation encoding on each of them.
+
+        :param count: The number of connections.
+        """
+        # Imported here, so that scenarios can be generated without the server sources, e.g. from the UI
+        from protocol import ENCODING_JSON, FrameDecoder, encode_message, hello_message
+
+        for _ in range(count):
+            sock = socket.create_connection((self.host, self.port))
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.sendall(encode_message(hello_message()))
+            self.sockets.append(sock)
+
+        for sock in self.sockets:
+            encoding: Optional[str] = None
+            decoder = FrameDecoder()
+            sock.settimeout(5)
+            try:
+                # Any hello reply ends the wait, including one keeping the JSON encoding
+                while encoding is None and decoder.recv_from(sock):
+                    for message in decoder.messages():
+                        if message.get("action") == "hello":
+                            encoding = message.get("encoding", ENCODING_JSON)
+                            break
+            except socket.timeout:
+                logging.warning("No hello reply, sending JSON estimations")
+            if encoding is None:
+                encoding = ENCODING_JSON
+            sock.settimeout(None)
+            self.encodings.append(encoding)
+
+    def stream(self, qualities: np.ndarray, rate: float, loop: bool = False) -> float:
+        """
+        Sends the qualities, one time step after the other.
+
+        :param qualities: The (time, node, channel) qualities of a scenario.
+        :param rate: The time steps per second, 0 for as fast as possible.
+        :param loop: Whether to start over at the end of the scenario, until interrupted.
+        :return: The duration of the stream, in seconds.
+        """
+        from protocol import encode_estimation
+
+        if not self.per_node:
+            qualities = qualities.mean(axis=1, keepdims=True)
+        self.connect(qualities.shape[1])
+
+        start = time.perf_counter()
+        step = 0
+        try:
+            while True:
+                for rows in qualities:
+                    if rate > 0:
+                        delay = start + step / rate - time.perf_counter()
+                        if delay > 0:
+                            time.sleep(delay)
+                    for sock, encoding, row in zip(self.sockets, self.encodings, rows.tolist()):
+                        sock.sendall(encode_estimation(row, self.channels, encoding))
+                    self.sent += len(rows)
+                    step += 1
+                if not loop:
+                    break
+        finally:
+            for sock in self.sockets:
+                sock.close()
+        return time.perf_counter() - start
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Generates a synthetic jamming scenario and streams it to the server as new_estimation messages')
+    parser.add_argument('--host', type=str, default="localhost", help='Host address of the server')
+    parser.add_argument('--port', type=int, default=8000, help='Port number of the server')
+    parser.add_argument('--nodes', type=int, default=10, help='Number of nodes')
+    parser.add_argument('--channels', type=int, default=len(CHANNELS), help='Number of channels')
+    parser.add_argument('--steps', type=int, default=600, help='Number of time steps')
+    parser.add_argument('--jammer', type=Jammer.parse, action='append', default=None,
+                        help=f'A jammer, {"|".join(JAMMER_MODES)} followed by comma separated parameters, e.g. sweep,rate=0.2 or hop,every=20. '
+                             'May be repeated, a single sweeping jammer by default')
+    parser.add_argument('--noise', type=float, default=0.05, help='Standard deviation of the estimation noise')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the random generator')
+    parser.add_argument('--rate', type=float, default=10, help='Time steps sent per second, 0 for as fast as possible')
+    parser.add_argument('--per-node', action='store_true', help='Send the estimations of every node on its own connection instead of their mean')
+    parser.add_argument('--loop', action='store_true', help='Start over at the end of the scenario')
+    parser.add_argument('--output', type=str, default=None, help='Save the qualities to this .npy file instead of streaming them')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    channels = CHANNELS[:args.channels] if args.channels <= len(CHANNELS) else list(range(args.channels))
+    try:
+        scenario = Scenario(args.nodes, len(channels), args.jammer or [Jammer()], args.noise, args.seed)
+    except ValueError as e:
+        logging.error(e)
+        return
+
+    start = time.perf_counter()
+    qualities = scenario.generate(args.steps)
+    elapsed = time.perf_counter() - start
+    logging.info("Generated %d steps x %d nodes x %d channels in %.3f s", *qualities.shape, elapsed)
+
+    if args.output:
+        np.save(args.output, qualities)
+        return
+
+    streamer = ScenarioStreamer(args.host, args.port, channels, args.per_node)
+    try:
+        duration: Optional[float] = streamer.stream(qualities, args.rate, args.loop)
+    except KeyboardInterrupt:
+        duration = None
+    logging.info("Sent %d estimations%s", streamer.sent, f" in {duration:.2f} s" if duration is not None else "")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
-import json
+import argparse
+import asyncio
 import logging
 import signal
 import socket
@@ -6,27 +7,60 @@ import sqlite3
 import sys
 import threading
 import time
-from typing import List, Tuple, Dict, Any
+from typing import Optional, Tuple, Dict, Any, Set
+
+from fanout import DROP_OLDEST, SLOW_CONSUMER_POLICIES, AsyncSendQueue, ClientRegistry, SendQueue
+from metrics import Metrics, MetricsDumper
+from protocol import FrameDecoder, encode_message, negotiate_encoding
+from recorder import Recorder
+from writer import DatabaseWriter
 
 logging.basicConfig(level=logging.INFO)
 
+# Actions counted by the metrics, others are counted as unknown
+ACTIONS = ("broadcast", "channel_switch", "new_estimation", "hello", "ping", "stats")
+
 
 class DatasetManager(threading.Thread):
-    def __init__(self):
+    def __init__(self, database: str = 'demo.db', interval: float = 1, prune_interval: float = 60):
         """
         Initializes the DatasetManager object and print nodes once values are updated.
+
+        Triggers append every write to node_channels and channel_quality to a changelog table. The monitor follows
+        the changelog from a cursor over a single connection, so each poll only reads the rows written since the
+        previous one, and prunes the entries it has consumed.
+
+        :param database: The path of the SQLite database.
+        :param interval: The interval between polls, in seconds.
+        :param prune_interval: The interval between deletions of consumed changelog entries, in seconds.
         """
         threading.Thread.__init__(self)
-        self.interval = 1
+        self.database = database
+        self.interval = interval
+        self.prune_interval = prune_interval
         self.running = True
+        self.cursor = 0
+        self.node_channels: Dict[int, int] = {}
+        self.channel_quality: Dict[int, float] = {}
         self.initialize_database()
 
     def initialize_database(self) -> None:
         """
         Initializes the SQLite database, creating the schema and inserting initial values.
         """
-        with sqlite3.connect('demo.db') as conn:
+        with sqlite3.connect(self.database) as conn:
             c = conn.cursor()
+            c.execute('DROP TABLE IF EXISTS changelog')
+            c.execute("""
+            CREATE TABLE IF NOT EXISTS changelog (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_name TEXT NOT NULL,
+                row_key INTEGER NOT NULL,
+                value
+            )
+            """)
+            conn.commit()
+
             c.execute('DROP TABLE IF EXISTS node_channels')
             c.execute("""
             CREATE TABLE IF NOT EXISTS node_channels (
@@ -34,6 +68,7 @@ class DatasetManager(threading.Thread):
                 channel INTEGER
             )
             """)
+            self.create_triggers(c, 'node_channels', 'node_id', 'channel')
             conn.commit()
 
             nodes = [(1, 36)]
@@ -48,64 +83,101 @@ class DatasetManager(threading.Thread):
                 quality REAL
             )
             """)
+            self.create_triggers(c, 'channel_quality', 'channel', 'quality')
             conn.commit()
 
+    @staticmethod
+    def create_triggers(c: sqlite3.Cursor, table: str, key: str, value: str) -> None:
+        """
+        Creates the triggers appending the inserted and updated rows of a table to the changelog. REPLACE fires the
+        insert trigger.
+
+        :param c: The cursor to create the triggers with.
+        :param table: The table to track.
+        :param key: The primary key column of the table.
+        :param value: The value column of the table.
+        """
+        for event in ('INSERT', 'UPDATE'):
+            c.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_{event.lower()}_changelog AFTER {event} ON {table}
+            BEGIN
+                INSERT INTO changelog (table_name, row_key, value) VALUES ('{table}', NEW.{key}, NEW.{value});
+            END
+            """)
+
     def run(self) -> None:
         """
-        Periodically fetches and displays data from the SQLite database.
+        Periodically reads the changes since the previous poll and displays them.
         """
-        display_channels_thread = threading.Thread(target=self.display_node_channels)
-        display_quality_thread = threading.Thread(target=self.display_channel_quality)
+        conn = sqlite3.connect(self.database)
+        last_prune = time.monotonic()
+        try:
+            while self.running:
+                time.sleep(self.interval)
+                try:
+                    changes = self.read_changes(conn)
+                    if time.monotonic() - last_prune >= self.prune_interval:
+                        self.prune(conn)
+                        last_prune = time.monotonic()
+                except sqlite3.Error:
+                    logging.error("Database connection error", exc_info=True)
+                    self.running = False
+                    break
 
-        display_channels_thread.start()
-        display_quality_thread.start()
+                self.display_node_channels(changes['node_channels'])
+                self.display_channel_quality(changes['channel_quality'])
+        finally:
+            conn.close()
 
-        display_channels_thread.join()
-        display_quality_thread.join()
+    def read_changes(self, conn: sqlite3.Connection) -> Dict[str, Dict[int, Any]]:
+        """
+        Reads the changelog entries after the cursor and moves the cursor past them.
 
-    def display_channel_quality(self) -> None:
+        :param conn: The connection of the monitor.
+        :return: The latest value of every changed row, per table.
         """
-        Periodically fetches and displays data from the channel_quality table.
+        rows = conn.execute("SELECT id, table_name, row_key, value FROM changelog WHERE id > ? ORDER BY id", (self.cursor,)).fetchall()
+        changes: Dict[str, Dict[int, Any]] = {'node_channels': {}, 'channel_quality': {}}
+        for _, table, key, value in rows:
+            changes[table][key] = value
+        if rows:
+            self.cursor = rows[-1][0]
+        return changes
+
+    def prune(self, conn: sqlite3.Connection) -> None:
         """
-        prev_results = None
-        while self.running:
-            time.sleep(self.interval)
-            try:
-                with sqlite3.connect('demo.db') as conn:
-                    c = conn.cursor()
-                    c.execute("SELECT * FROM channel_quality")
-                    results = c.fetchall()
-                    if prev_results is None or results != prev_results:
-                        logging.info("Channel Quality:")
-                        for row in results:
-                            logging.info(f"Channel: {row[0]}, Quality: {row[1]}")
-                        prev_results = results
-            except Exception as e:
-                logging.error("Database connection error", exc_info=True)
-                self.running = False
-                break
+        Deletes the changelog entries already read.
 
-    def display_node_channels(self) -> None:
+        :param conn: The connection of the monitor.
         """
-        Periodically fetches and displays data from the node_channels table.
+        with conn:
+            conn.execute("DELETE FROM changelog WHERE id <= ?", (self.cursor,))
+
+    def display_channel_quality(self, changes: Dict[int, float]) -> None:
         """
-        prev_results = None
-        while self.running:
-            time.sleep(self.interval)
-            try:
-                with sqlite3.connect('demo.db') as conn:
-                    c = conn.cursor()
-                    c.execute("SELECT * FROM node_channels")
-                    results = c.fetchall()
-                    if prev_results is None or results != prev_results:
-                        logging.info("Node Channels:")
-                        for row in results:
-                            logging.info(f"Node ID: {row[0]}, Channel: {row[1]}")
-                        prev_results = results
-            except Exception as e:
-                logging.error("Database connection error", exc_info=True)
-                self.running = False
-                break
+        Displays the channel_quality rows whose value changed.
+
+        :param changes: The latest value of every changed channel.
+        """
+        changed = {channel: quality for channel, quality in changes.items() if self.channel_quality.get(channel) != quality}
+        if changed:
+            logging.info("Channel Quality:")
+            for channel, quality in changed.items():
+                logging.info(f"Channel: {channel}, Quality: {quality}")
+            self.channel_quality.update(changed)
+
+    def display_node_channels(self, changes: Dict[int, int]) -> None:
+        """
+        Displays the node_channels rows whose value changed.
+
+        :param changes: The latest channel of every changed node.
+        """
+        changed = {node_id: channel for node_id, channel in changes.items() if self.node_channels.get(node_id) != channel}
+        if changed:
+            logging.info("Node Channels:")
+            for node_id, channel in changed.items():
+                logging.info(f"Node ID: {node_id}, Channel: {channel}")
+            self.node_channels.update(changed)
 
     def stop(self) -> None:
         """
@@ -116,150 +188,398 @@ class DatasetManager(threading.Thread):
 
 
 class Client(threading.Thread):
-    def __init__(self, socket: socket.socket, address: Tuple[str, int], clients: List["Client"]):
+    def __init__(self, socket: socket.socket, address: Tuple[str, int], clients: ClientRegistry["Client"], writer: DatabaseWriter,
+                 queue_size: int = 256, policy: str = DROP_OLDEST, recorder: Optional[Recorder] = None):
         """
         Initializes the Client object.
 
         :param socket: The connected socket for the client.
         :param address: The address of the client.
-        :param clients: A list of all connected clients.
+        :param clients: The registry of all connected clients.
+        :param writer: The database writer shared by all clients.
+        :param queue_size: The number of outbound frames queued before the slow consumer policy applies.
+        :param policy: The slow consumer policy, DROP_OLDEST or DISCONNECT.
+        :param recorder: Records every frame received from the client, if given.
         """
         threading.Thread.__init__(self)
         self.socket = socket
         self.address = address
         self.running = True
-        self.conn = sqlite3.connect('demo.db', check_same_thread=False)
-        self.c = self.conn.cursor()
+        self.writer = writer
         self.clients = clients
+        self.decoder = FrameDecoder(on_frame=record_connection(recorder))
+        self.metrics = Metrics.get_instance()
+        self.metrics.increment("connections.opened")
+        self.send_queue = SendQueue(socket, address, queue_size, policy)
+        self.send_queue.start()
         self.start()
 
     def run(self) -> None:
         """
         Handles incoming messages from the client and updates the SQLite database.
         """
-        while self.running:
-            try:
-                message = self.socket.recv(1024).decode()
-                if not message:
-                    break
+        try:
+            while self.running:
+                try:
+                    if not self.decoder.recv_from(self.socket):
+                        break
 
-                json_object = json.loads(message)
-                action = json_object.get("action")
-                if action == "broadcast":
-                    self.broadcast(json_object)
-                elif action == "channel_switch":
-                    self.update_node_channel(json_object["node_id"], json_object["channel"])
-                elif action == "new_estimation":
-                    self.store_channel_quality(json_object["channel_quality"], json_object["channels"])
-            except ConnectionResetError:
-                logging.warning("Connection forcibly closed by the remote host")
-                break
-            except ValueError:
-                logging.warning("Message is not a JSON", exc_info=True)
-                break
+                    for json_object in self.metrics.timed("decode_time", self.decoder.messages()):
+                        handle_message(self, self.writer, json_object)
+                except ConnectionResetError:
+                    logging.warning("Connection forcibly closed by the remote host")
+                    break
+                except ValueError:
+                    logging.warning("Message is not a JSON", exc_info=True)
+                    break
+                except OSError:
+                    break
+        finally:
+            # Also reached when a malformed message raises, so that no dead client stays registered
+            self.clients.remove(self)
+            self.send_queue.close()
+            self.socket.close()
+            self.metrics.increment("connections.closed")
 
     def broadcast(self, message: Dict[str, Any]) -> None:
         """
-        Sends a message to all connected clients except for the sender.
+        Sends a message to all connected clients except for the sender. The message is encoded once and queued on
+        every client, whose own sending thread writes it to the socket.
 
         :param message: The message to broadcast.
         """
-        for client in self.clients[:]:  # create a copy of the list for safe iteration
-            if client != self:
-                try:
-                    client.socket.sendall(json.dumps(message).encode())
-                except BrokenPipeError:
-                    print("Broken pipe error, client disconnected:", client.address)
+        start = time.perf_counter()
+        data = encode_message(message)
+        recipients = 0
+        for client in self.clients.snapshot():
+            if client is not self:
+                recipients += 1
+                if not client.send_queue.put(data):
                     self.clients.remove(client)
-
-    def update_node_channel(self, node_id: int, channel: int) -> None:
-        """
-        Updates the node_channels table with the given node_id and channel values.
-
-        :param node_id: The node ID to update in the table.
-        :param channel: The channel value to set for the node.
-        """
-        self.c.execute("""
-        REPLACE INTO node_channels (node_id, channel)
-        VALUES (?, ?)
-        """, (node_id, channel))
-        self.conn.commit()
-
-    def store_channel_quality(self, channel_quality: List[float], channels: List[int]) -> None:
-        """
-        Stores the channel quality data in the channel_quality table.
-
-        :param channel_quality: A list of channel quality values.
-        :param channels: A list of channel indices corresponding to the quality values.
-        """
-        for channel, quality in zip(channels, channel_quality):
-            self.c.execute("""
-            REPLACE INTO channel_quality (channel, quality)
-            VALUES (?, ?)
-            """, (channel, quality))
-        self.conn.commit()
+        self.metrics.observe("broadcast_fanout_time", time.perf_counter() - start)
+        self.metrics.increment("broadcast.recipients", recipients)
 
     def stop(self) -> None:
         """
-        Stops the Client thread and closes the socket and database connections.
+        Stops the Client thread and closes the socket.
         """
         self.running = False
+        self.send_queue.close()
         self.socket.close()
-        self.conn.close()
 
 
 class Server:
-    def __init__(self, host: str, port: int):
+    def __init__(self, host: str, port: int, writer: DatabaseWriter, queue_size: int = 256, policy: str = DROP_OLDEST,
+                 recorder: Optional[Recorder] = None):
         """
         Initializes the Server object.
 
         :param host: The host address to bind the server to.
         :param port: The port number to bind the server to.
+        :param writer: The database writer shared by all clients.
+        :param queue_size: The number of outbound frames queued per client before the slow consumer policy applies.
+        :param policy: The slow consumer policy, DROP_OLDEST or DISCONNECT.
+        :param recorder: Records every frame received by the server, if given.
         """
         self.host = host
         self.port = port
-        self.clients: List[Client] = []
+        self.writer = writer
+        self.queue_size = queue_size
+        self.policy = policy
+        self.recorder = recorder
+        self.clients: ClientRegistry[Client] = ClientRegistry()
+        self.listening = threading.Event()
 
     def start(self) -> None:
         """
         Starts the server and listens for incoming client connections.
         """
         signal.signal(signal.SIGINT, self.signal_handler)
+        signal.signal(signal.SIGTERM, self.signal_handler)
+        self.serve()
 
+    def serve(self) -> None:
+        """
+        Accepts client connections forever.
+        """
         serversocket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         serversocket.bind((self.host, self.port))
-        serversocket.listen(5)
+        serversocket.listen(socket.SOMAXCONN)
+        self.port = serversocket.getsockname()[1]
+        register_gauges(self.writer, lambda: [client.send_queue for client in self.clients.snapshot()])
+        self.listening.set()
         logging.info("server started and listening")
 
         while True:
             c_socket, c_address = serversocket.accept()
-            client = Client(c_socket, c_address, self.clients)
+            client = Client(c_socket, c_address, self.clients, self.writer, self.queue_size, self.policy, self.recorder)
             print('New connection', client)
-            self.clients.append(client)
+            self.clients.add(client)
 
     def signal_handler(self, sig: signal.Signals, frame) -> None:
         """
-        Handles a signal interrupt (SIGINT) and stops the server gracefully.
+        Handles a signal interrupt (SIGINT) or termination (SIGTERM) and stops the server gracefully.
 
         :param sig: The signal received by the handler.
         :param frame: The current execution frame.
         """
         print("Attempting to close threads.")
-        for client in self.clients:
+        for client in self.clients.snapshot():
             print("joining", client.address)
             client.stop()
+        self.writer.stop()
+        if self.recorder is not None:
+            self.recorder.close()
         print("threads successfully closed")
         sys.exit(0)
 
 
+class AsyncConnection:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, server: "AsyncServer"):
+        """
+        Initializes the AsyncConnection object.
+
+        :param reader: The stream reader of the connection.
+        :param writer: The stream writer of the connection.
+        :param server: The server that accepted the connection.
+        """
+        self.reader = reader
+        self.writer = writer
+        self.server = server
+        self.address = writer.get_extra_info("peername")
+        self.decoder = FrameDecoder(on_frame=record_connection(server.recorder))
+        self.metrics = Metrics.get_instance()
+        self.send_queue = AsyncSendQueue(writer, self.address, server.queue_size, server.policy)
+
+    async def run(self) -> None:
+        """
+        Handles incoming messages from the client until the connection is closed.
+        """
+        while True:
+            try:
+                data = await self.reader.read(65536)
+                if not data:
+                    break
+
+                self.decoder.feed(data)
+                for json_object in self.metrics.timed("decode_time", self.decoder.messages()):
+                    handle_message(self, self.server.writer, json_object)
+            except ConnectionError:
+                logging.warning("Connection forcibly closed by the remote host")
+                break
+            except ValueError:
+                logging.warning("Message is not a JSON", exc_info=True)
+                break
+
+    def broadcast(self, message: Dict[str, Any]) -> None:
+        """
+        Sends a message to all connected clients except for the sender. The message is encoded once and queued on
+        every connection, whose own task writes it to the stream.
+
+        :param message: The message to broadcast.
+        """
+        start = time.perf_counter()
+        data = encode_message(message)
+        recipients = 0
+        for connection in list(self.server.connections):
+            if connection is not self:
+                recipients += 1
+                if not connection.send_queue.put(data):
+                    self.server.connections.discard(connection)
+        self.metrics.observe("broadcast_fanout_time", time.perf_counter() - start)
+        self.metrics.increment("broadcast.recipients", recipients)
+
+    def close(self) -> None:
+        """
+        Stops the sending task and closes the underlying stream.
+        """
+        self.send_queue.close()
+        self.writer.close()
+
+
+class AsyncServer:
+    def __init__(self, host: str, port: int, writer: DatabaseWriter, queue_size: int = 256, policy: str = DROP_OLDEST,
+                 recorder: Optional[Recorder] = None):
+        """
+        Initializes the AsyncServer object. All connections are served from a single event loop and every database
+        write goes through the database writer, which owns the only writing SQLite connection of the server.
+
+        :param host: The host address to bind the server to.
+        :param port: The port number to bind the server to.
+        :param writer: The database writer shared by all connections.
+        :param queue_size: The number of outbound frames queued per connection before the slow consumer policy applies.
+        :param policy: The slow consumer policy, DROP_OLDEST or DISCONNECT.
+        :param recorder: Records every frame received by the server, if given.
+        """
+        self.host = host
+        self.port = port
+        self.writer = writer
+        self.queue_size = queue_size
+        self.policy = policy
+        self.recorder = recorder
+        self.connections: Set[AsyncConnection] = set()
+        self.listening = threading.Event()
+
+    def start(self) -> None:
+        """
+        Starts the event loop and serves clients until interrupted or terminated.
+        """
+        # Terminated like interrupted, so that the writer and the recorder are flushed
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            logging.info("server stopped")
+        finally:
+            self.writer.stop()
+            if self.recorder is not None:
+                self.recorder.close()
+
+    async def serve(self) -> None:
+        """
+        Listens for incoming client connections.
+        """
+        server = await asyncio.start_server(self.handle_connection, self.host, self.port, backlog=socket.SOMAXCONN)
+        self.port = server.sockets[0].getsockname()[1]
+        register_gauges(self.writer, lambda: [connection.send_queue for connection in list(self.connections)])
+        self.listening.set()
+        logging.info("async server started and listening")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for connection in list(self.connections):
+                connection.close()
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Serves a single client connection.
+
+        :param reader: The stream reader of the connection.
+        :param writer: The stream writer of the connection.
+        """
+        connection = AsyncConnection(reader, writer, self)
+        logging.info("New connection %s", connection.address)
+        self.connections.add(connection)
+        connection.metrics.increment("connections.opened")
+        sender = asyncio.create_task(connection.send_queue.run())
+        try:
+            await connection.run()
+        finally:
+            self.connections.discard(connection)
+            connection.close()
+            await sender
+            connection.metrics.increment("connections.closed")
+
+
+def handle_message(connection: Any, writer: DatabaseWriter, json_object: Dict[str, Any]) -> None:
+    """
+    Dispatches a decoded message to the handler of its action. Shared by both servers, a connection only provides its
+    decoder, its send queue and the broadcast to the other connections.
+
+    :param connection: The Client or AsyncConnection the message was received on.
+    :param writer: The database writer of the server.
+    :param json_object: The decoded message.
+    """
+    metrics = Metrics.get_instance()
+    action = json_object.get("action")
+    metrics.increment(f"messages.{action}" if action in ACTIONS else "messages.unknown")
+    if action == "broadcast":
+        connection.broadcast(json_object)
+    elif action == "channel_switch":
+        writer.update_node_channel(json_object["node_id"], json_object["channel"])
+    elif action == "new_estimation":
+        writer.store_channel_quality(json_object["channel_quality"], json_object["channels"])
+    elif action == "hello":
+        encoding = negotiate_encoding(json_object.get("encodings", []))
+        connection.decoder.set_encoding(encoding)
+        connection.send_queue.put(encode_message({"action": "hello", "encoding": encoding}))
+    elif action == "ping":
+        connection.send_queue.put(encode_message(dict(json_object, action="pong")))
+    elif action == "stats":
+        connection.send_queue.put(encode_message({"action": "stats", "stats": metrics.snapshot()}))
+
+
+def register_gauges(writer: DatabaseWriter, send_queues) -> None:
+    """
+    Registers the gauges of the server, read when the metrics are read.
+
+    :param writer: The database writer of the server.
+    :param send_queues: Returns the send queues of the connected clients.
+    """
+    metrics = Metrics.get_instance()
+    metrics.register_gauge("clients", lambda: len(send_queues()))
+    metrics.register_gauge("send_queue_depth", lambda: sum(len(queue.queue) for queue in send_queues()))
+    metrics.register_gauge("send_queue_depth_max", lambda: max((len(queue.queue) for queue in send_queues()), default=0))
+    metrics.register_gauge("threads", threading.active_count)
+    metrics.register_gauge("writer_pending_rows", writer.pending_rows)
+
+
+def record_connection(recorder: Optional[Recorder]):
+    """
+    Numbers a new connection for the recorder.
+
+    :param recorder: The recorder of the server, if any.
+    :return: The frame callback recording the frames of the connection, None if the server does not record.
+    """
+    if recorder is None:
+        return None
+    connection = recorder.open_connection()
+    return lambda kind, payload: recorder.record(connection, kind, payload)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Mesh Network Jamming Avoidance Demo Server')
+    parser.add_argument('--host', type=str, default="40.40.40.5", help='Host address to bind the server to')
+    parser.add_argument('--port', type=int, default=8000, help='Port number to bind the server to')
+    parser.add_argument('--asyncio', action='store_true', help='Serve all clients from a single asyncio event loop instead of one thread per client')
+    parser.add_argument('--flush-interval', type=float, default=0.05, help='Coalescing window of database writes in seconds')
+    parser.add_argument('--send-queue-size', type=int, default=256, help='Number of outbound frames queued per client before the slow consumer policy applies')
+    parser.add_argument('--record', type=str, default=None, help='Append every received message to this file, for replay.py')
+    parser.add_argument('--metrics-file', type=str, default=None, help='Append a snapshot of the server metrics to this file periodically, one JSON object per line')
+    parser.add_argument('--metrics-interval', type=float, default=10, help='Interval between metrics snapshots in seconds')
+    parser.add_argument('--shared-memory', type=str, default=None, help='Also publish the current state to this shared memory segment, read by main.py --shared-memory')
+    parser.add_argument('--slow-consumer', choices=SLOW_CONSUMER_POLICIES, default=DROP_OLDEST, help='Drop the oldest queued frame or disconnect clients that cannot keep up')
+    return parser.parse_args()
+
+
 def main():
+    args = parse_args()
+
     dd = DatasetManager()
     dd.start()
 
-    host, port = "40.40.40.5", 8000
-    #host, port = "localhost", 8000
-    server = Server(host, port)
-    server.start()
+    shared_state = None
+    if args.shared_memory:
+        # Imported here, numpy is only needed by the shared memory transport
+        from shared_state import SharedState
+        shared_state = SharedState(args.shared_memory)
+        shared_state.load(dd.database)
+
+    writer = DatabaseWriter(flush_interval=args.flush_interval, shared_state=shared_state)
+    writer.start()
+
+    recorder = Recorder(args.record) if args.record else None
+
+    dumper = None
+    if args.metrics_file:
+        dumper = MetricsDumper(args.metrics_file, args.metrics_interval)
+        dumper.start()
+
+    if args.asyncio:
+        server = AsyncServer(args.host, args.port, writer, args.send_queue_size, args.slow_consumer, recorder)
+    else:
+        server = Server(args.host, args.port, writer, args.send_queue_size, args.slow_consumer, recorder)
+    try:
+        server.start()
+    finally:
+        if dumper is not None:
+            dumper.stop()
+        if recorder is not None:
+            recorder.close()
+        if shared_state is not None:
+            shared_state.close()
+        dd.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,145 @@
+"""
+Shared memory segment publishing the current node channels and channel qualities to the UI.
+
+The segment has a fixed layout of native-endian 64-bit values, mirrored by SharedMemoryDataSource in data_source.py:
+
+    header          int64[8]            MAGIC, sequence, max_nodes, max_channels, node_count, channel_count, generation, 0
+    node_ids        int64[max_nodes]    sorted
+    node_channels   int64[max_nodes]
+    channels        int64[max_channels] sorted
+    qualities       float64[max_channels]
+
+The sequence is a seqlock: the publisher makes it odd before writing and even again after, so a reader that sees the
+same even sequence before and after copying the arrays read a consistent state. The generation is a random number
+drawn by every new segment, so that readers still attached to the segment of a previous server notice the new one.
+"""
+
+import logging
+import secrets
+import sqlite3
+from multiprocessing import shared_memory
+from typing import Dict, Mapping
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+
+MAGIC = int.from_bytes(b'JAMSHM01', 'little')
+HEADER_FIELDS = 8
+SEQUENCE, MAX_NODES, MAX_CHANNELS, NODE_COUNT, CHANNEL_COUNT, GENERATION = range(1, 7)
+
+
+def segment_size(max_nodes: int, max_channels: int) -> int:
+    return 8 * (HEADER_FIELDS + 2 * max_nodes + 2 * max_channels)
+
+
+class SharedState:
+    def __init__(self, name: str = 'jamui', max_nodes: int = 1024, max_channels: int = 4096):
+        """
+        Initializes the SharedState object, creating the shared memory segment, replacing a segment left by a server
+        that did not exit cleanly.
+
+        :param name: The name of the segment.
+        :param max_nodes: The number of nodes the segment holds.
+        :param max_channels: The number of channels the segment holds.
+        """
+        size = segment_size(max_nodes, max_channels)
+        try:
+            self.memory = shared_memory.SharedMemory(name, create=True, size=size)
+        except FileExistsError:
+            stale = shared_memory.SharedMemory(name)
+            # Readers still attached to the stale segment see it closed, as if its server had exited cleanly
+            if stale.size >= 8:
+                stale.buf[:8] = bytes(8)
+            stale.close()
+            stale.unlink()
+            self.memory = shared_memory.SharedMemory(name, create=True, size=size)
+
+        self.name = name
+        self.max_nodes = max_nodes
+        self.max_channels = max_channels
+        buffer = self.memory.buf
+        self.header = np.ndarray((HEADER_FIELDS,), np.int64, buffer)
+        offset = 8 * HEADER_FIELDS
+        self.node_ids = np.ndarray((max_nodes,), np.int64, buffer, offset)
+        self.node_channels = np.ndarray((max_nodes,), np.int64, buffer, offset + 8 * max_nodes)
+        offset += 16 * max_nodes
+        self.channels = np.ndarray((max_channels,), np.int64, buffer, offset)
+        self.qualities = np.ndarray((max_channels,), np.float64, buffer, offset + 8 * max_channels)
+
+        # Slot of every key in the arrays, kept sorted so that readers get the order of the SQLite tables
+        self.node_slots: Dict[int, int] = {}
+        self.channel_slots: Dict[int, int] = {}
+
+        self.header[:] = 0
+        self.header[MAX_NODES] = max_nodes
+        self.header[MAX_CHANNELS] = max_channels
+        self.header[GENERATION] = secrets.randbits(63) or 1
+        self.header[0] = MAGIC
+        logging.info("Publishing state to shared memory segment %s, %d bytes", name, size)
+
+    def update(self, node_channels: Mapping[int, int], channel_quality: Mapping[int, float]) -> None:
+        """
+        Publishes changed rows. Must be called from a single thread, e.g. the database writer.
+
+        :param node_channels: The changed channels, per node ID.
+        :param channel_quality: The changed qualities, per channel.
+        """
+        if not node_channels and not channel_quality:
+            return
+
+        header = self.header
+        header[SEQUENCE] += 1
+        try:
+            self.write(node_channels, self.node_slots, self.node_ids, self.node_channels, NODE_COUNT)
+            self.write(channel_quality, self.channel_slots, self.channels, self.qualities, CHANNEL_COUNT)
+        finally:
+            header[SEQUENCE] += 1
+
+    def write(self, rows: Mapping[int, float], slots: Dict[int, int], keys: np.ndarray, values: np.ndarray, count: int) -> None:
+        """
+        Writes rows in place, rebuilding the arrays in key order when a new key appears.
+
+        :param rows: The changed values, per key.
+        :param slots: The slot of every published key.
+        :param keys: The keys of the segment.
+        :param values: The values of the segment.
+        :param count: The header field holding the number of keys.
+        """
+        if not rows:
+            return
+        if all(key in slots for key in rows):
+            for key, value in rows.items():
+                values[slots[key]] = value
+            return
+
+        merged = {int(key): value for key, value in zip(keys[:len(slots)].tolist(), values[:len(slots)].tolist())}
+        merged.update(rows)
+        if len(merged) > len(keys):
+            logging.warning("Shared memory segment %s holds %d keys, dropping %d", self.name, len(keys), len(merged) - len(keys))
+        ordered = sorted(merged.items())[:len(keys)]
+        keys[:len(ordered)] = [key for key, _ in ordered]
+        values[:len(ordered)] = [value for _, value in ordered]
+        slots.clear()
+        slots.update((key, slot) for slot, (key, _) in enumerate(ordered))
+        self.header[count] = len(ordered)
+
+    def load(self, database: str) -> None:
+        """
+        Publishes the rows already stored in the database.
+
+        :param database: The path of the SQLite database.
+        """
+        with sqlite3.connect(database) as conn:
+            node_channels = dict(conn.execute("SELECT node_id, channel FROM node_channels").fetchall())
+            channel_quality = dict(conn.execute("SELECT channel, quality FROM channel_quality").fetchall())
+        self.update(node_channels, channel_quality)
+
+    def close(self) -> None:
+        """
+        Removes the segment. Readers still attached keep their mapping.
+        """
+        self.header[0] = 0
+        del self.header, self.node_ids, self.node_channels, self.channels, self.qualities
+        self.memory.close()
+        self.memory.unlink()
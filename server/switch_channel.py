@@ -1,21 +1,181 @@
-import json
-import os
-import re
+import argparse
 import socket
-import subprocess
 import threading
 import time
+import traceback
+from collections import deque
+from typing import Callable, Deque, Optional, TypeVar
+
+from protocol import FrameDecoder, encode_message
+from radio import CONFIG_RENDER, INTERFACE_DOWN, LINK_UP, SUPPLICANT_KILL, SUPPLICANT_START, RadioBackend, ShellRadio, SimulatedRadio, SwitchProfile
+
+# State of the switcher between switches, the name of the running step otherwise
+IDLE = "idle"
+
+T = TypeVar("T")
+
+
+class ChannelSwitcher(threading.Thread):
+    def __init__(self, radio: Optional[RadioBackend] = None, on_switched: Optional[Callable[[int], None]] = None, poll_interval: float = 0.1,
+                 down_timeout: float = 10.0, up_timeout: float = 10.0, history: int = 100, on_failed: Optional[Callable[[int], None]] = None) -> None:
+        """
+        Initialize the ChannelSwitcher object, the worker switching the radio to the latest requested frequency.
+
+        Requests never block: a request made during a switch replaces any pending one, so only the latest target is
+        switched to once the current switch is done. Each step waits for the radio to be ready, polling its state, and
+        the timeouts only bound a radio that never gets there. Every switch is profiled step by step.
+
+        :param radio: A RadioBackend driving the radio, a ShellRadio on wlp1s0 by default.
+        :param on_switched: Called with the new frequency once the radio joined it, or right away if it already was on it.
+        :param poll_interval: A float representing the time between readiness checks, in seconds.
+        :param down_timeout: A float representing the maximum wait for the interface to go down, in seconds.
+        :param up_timeout: A float representing the maximum wait for the interface to join the new frequency, in seconds.
+        :param history: An integer representing the number of switch profiles kept.
+        :param on_failed: Called with the requested frequency when its switch raised.
+        """
+        super().__init__(daemon=True)
+        self.radio = radio if radio is not None else ShellRadio()
+        self.on_switched = on_switched
+        self.on_failed = on_failed
+        self.poll_interval = poll_interval
+        self.down_timeout = down_timeout
+        self.up_timeout = up_timeout
+        self.condition = threading.Condition()
+        self.target: Optional[int] = None
+        self.frequency: Optional[int] = None
+        self.state = IDLE
+        self.profiles: Deque[SwitchProfile] = deque(maxlen=history)
+        self.running = True
+
+    def request(self, freq: int) -> None:
+        """
+        Request a switch to a frequency, replacing any request not started yet.
+
+        :param freq: An integer representing the new frequency.
+        """
+        with self.condition:
+            if self.target is not None and self.target != freq:
+                print(f"Switch to {self.target} MHz superseded by {freq} MHz")
+            self.target = freq
+            self.condition.notify()
+
+    def pending(self) -> bool:
+        with self.condition:
+            return self.target is not None
+
+    def take_target(self) -> Optional[int]:
+        """
+        Wait for a request.
+
+        :return: The latest requested frequency, or None once stopped.
+        """
+        with self.condition:
+            while self.target is None and self.running:
+                self.condition.wait()
+            target, self.target = self.target, None
+            return target if self.running else None
+
+    def run(self) -> None:
+        while True:
+            freq = self.take_target()
+            if freq is None:
+                break
+            if freq == self.frequency:
+                print(f"Already on {freq} MHz")
+                if self.on_switched is not None and not self.pending():
+                    self.on_switched(freq)
+                continue
+
+            # A failed switch is reported and the worker waits for the next request
+            try:
+                if not self.switch(freq):
+                    break
+            except Exception:
+                print(f"Switch to {freq} MHz failed")
+                traceback.print_exc()
+                self.state = IDLE
+                if self.on_failed is not None:
+                    self.on_failed(freq)
+
+    def switch(self, freq: int) -> bool:
+        """
+        Switch the radio to a frequency.
+
+        :param freq: An integer representing the new frequency.
+        :return: False if the switcher was stopped during the switch, True otherwise.
+        """
+        print(f"\nChanging channels... moving to {freq} MHz\n")
+        # Until the switch is confirmed the radio is on an unknown frequency
+        self.frequency = None
+        profile = SwitchProfile(freq)
+        self.step(profile, INTERFACE_DOWN, self.radio.interface_down)
+        if not self.step(profile, SUPPLICANT_KILL, self.kill_supplicant):
+            print(f"Radio still up after {self.down_timeout} s")
+
+        # Requests made while the interface went down are folded in before configuring
+        latest = self.take_target() if self.pending() else freq
+        if latest is None:
+            return False
+        freq = profile.frequency = latest
+
+        self.step(profile, CONFIG_RENDER, self.radio.render_config, freq)
+        self.step(profile, SUPPLICANT_START, self.radio.start_supplicant)
+        profile.confirmed = self.step(profile, LINK_UP, self.wait_until, lambda: self.radio.is_on_frequency(freq), self.up_timeout)
+        self.state = IDLE
+        # Without confirmation the radio may not be on the frequency, so a retry to it is not skipped
+        if profile.confirmed:
+            self.frequency = freq
+        self.profiles.append(profile)
+        print(profile.report())
+
+        # A newer request switches again right away, the intermediate frequency is not acknowledged
+        if self.on_switched is not None and not self.pending():
+            self.on_switched(freq)
+        return True
+
+    def step(self, profile: SwitchProfile, step: str, action: Callable[..., T], *args) -> T:
+        self.state = step
+        return profile.timed(step, action, *args)
+
+    def kill_supplicant(self) -> bool:
+        self.radio.kill_supplicant()
+        return self.wait_until(self.radio.is_down, self.down_timeout)
+
+    def wait_until(self, predicate: Callable[[], bool], timeout: float) -> bool:
+        """
+        Poll a readiness check until it passes.
+
+        :param predicate: The readiness check.
+        :param timeout: A float representing the maximum wait, in seconds.
+        :return: Whether the check passed before the timeout.
+        """
+        deadline = time.monotonic() + timeout
+        while self.running:
+            if predicate():
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(self.poll_interval)
+        return False
+
+    def stop(self) -> None:
+        with self.condition:
+            self.running = False
+            self.condition.notify()
 
 
 class CommsClient(threading.Thread):
-    def __init__(self, node_id: int, freq: int, host: str, port: int) -> None:
+    def __init__(self, node_id: int, freq: int, host: str, port: int, radio: Optional[RadioBackend] = None) -> None:
         """
         Initialize the CommsClient object.
 
+        Broadcasts are handed to a ChannelSwitcher, so messages keep being received while the radio switches.
+
         :param node_id: An integer representing the node ID.
         :param freq: An integer representing the channel frequency.
         :param host: A string representing the host address.
         :param port: An integer representing the port number.
+        :param radio: A RadioBackend driving the radio, a ShellRadio on wlp1s0 by default.
         """
         super().__init__()
         self.node_id = node_id
@@ -23,12 +183,19 @@ class CommsClient(threading.Thread):
         self.host = host
         self.port = port
         self.running = threading.Event()
-        self.switching = threading.Event()
+        self.send_lock = threading.Lock()
+        self.switcher = ChannelSwitcher(radio, on_switched=self.ack_channel_change)
+        self.switcher.frequency = freq
         self.socket = socket.socket(socket.AF_INET6, socket.SOCK_STREAM)
 
+    @property
+    def switching(self) -> bool:
+        return self.switcher.state != IDLE or self.switcher.pending()
+
     def run(self) -> None:
         self.socket.connect((self.host, self.port))
         self.running.set()
+        self.switcher.start()
         receive_thread = threading.Thread(target=self.receive_messages, args=(self.socket,))
         receive_thread.start()
 
@@ -38,21 +205,17 @@ class CommsClient(threading.Thread):
 
         :param socket: A socket object representing the connection.
         """
+        decoder = FrameDecoder()
         while self.running.is_set():
             try:
-                message = socket.recv(1024).decode()
-                if not message:
+                if not decoder.recv_from(socket):
                     break
 
-                json_object = json.loads(message)
-                action = json_object.get("action")
-                if action == "broadcast":
-                    print(f"Node {self.node_id} received broadcast: {message}")
-                    new_channel = json_object['channel']
-                    if not self.switching.is_set():
-                        self.switching.set()
-                        self.switch_channel(new_channel)
-                        self.switching.clear()
+                for json_object in decoder.messages():
+                    action = json_object.get("action")
+                    if action == "broadcast":
+                        print(f"Node {self.node_id} received broadcast: {json_object}")
+                        self.switcher.request(json_object['channel'])
 
             except ConnectionResetError:
                 print("Connection forcibly closed by the remote host")
@@ -63,60 +226,46 @@ class CommsClient(threading.Thread):
 
     def stop(self) -> None:
         self.running.clear()
+        self.switcher.stop()
         self.socket.close()
         self.join()
 
     def switch_channel(self, freq: int) -> None:
         """
-        Change the channel and call the ack_channel_change method.
+        Request a channel change, acknowledged with the ack_channel_change method once the radio joined it.
 
         :param freq: An integer representing the new frequency.
         """
-        print(f"\nChanging channels... moving to {freq} MHz\n")
-        subprocess.run(['ifconfig', 'wlp1s0', '0'])
-        subprocess.run(['ifconfig', 'wlp1s0', 'down'])
-        subprocess.run(['killall', 'wpa_supplicant'])
-        time.sleep(10)
-
-        filename = '/var/run/wpa_supplicant/wlp1s0'
-        if os.path.exists(filename):
-            os.remove(filename)
-            print(f"{filename} deleted")
-
-        with open('/var/run/wpa_supplicant-11s.conf', 'r') as f:
-            conf = f.read()
-        conf = re.sub(r'frequency=\d+', f'frequency={freq}', conf)
-        conf = re.sub(r'country=\d+', f'country=US', conf)
-        with open('/var/run/wpa_supplicant-11s.conf', 'w') as f:
-            f.write(conf)
-
-        subprocess.run(['wpa_supplicant', '-Dnl80211', '-iwlp1s0', '-c', '/var/run/wpa_supplicant-11s.conf', '-B'])
-        time.sleep(4)
-        subprocess.run(['iw', 'dev'])
-
-        # Update current frequency
-        self.frequency = freq
-
-        # Call the ack_channel_change method after the channel has been switched
-        self.ack_channel_change()
+        self.switcher.request(freq)
 
-
-    def ack_channel_change(self) -> None:
+    def ack_channel_change(self, freq: int) -> None:
         """
         Send an acknowledgement to the socket server with the node and channel.
+
+        :param freq: An integer representing the new frequency.
         """
+        self.frequency = freq
         data = {'action': 'channel_switch', 'node_id': self.node_id, 'channel': self.frequency}
-        json_str = json.dumps(data)
-        self.socket.send(json_str.encode())
+        with self.send_lock:
+            self.socket.sendall(encode_message(data))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Switches the mesh radio to the channels broadcast by the server')
+    parser.add_argument('--host', type=str, default="fd01::1", help='Host address of the server')
+    parser.add_argument('--port', type=int, default=8080, help='Port number of the server')
+    parser.add_argument('--node-id', type=int, default=1, help='ID of the node')
+    parser.add_argument('--frequency', type=int, default=5180, help='Initial frequency of the radio in MHz')
+    parser.add_argument('--interface', type=str, default='wlp1s0', help='Wireless interface of the mesh')
+    parser.add_argument('--simulated', action='store_true', help='Simulate the radio instead of switching the interface')
+    return parser.parse_args()
 
 
 def main():
-    host = "fd01::1"
-    port = 8080
-    node_id = 1
-    freq = 5180
+    args = parse_args()
+    radio = SimulatedRadio() if args.simulated else ShellRadio(args.interface)
 
-    client = CommsClient(node_id, freq, host, port)
+    client = CommsClient(args.node_id, args.frequency, args.host, args.port, radio)
     client.start()
 
     try:
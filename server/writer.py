@@ -0,0 +1,184 @@
+import logging
+import math
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence
+
+from metrics import Metrics
+
+logging.basicConfig(level=logging.INFO)
+
+
+class DatabaseWriter(threading.Thread):
+    def __init__(self, database: str = 'demo.db', flush_interval: float = 0.05, synchronous: str = 'NORMAL', shared_state: Optional[Any] = None):
+        """
+        Initializes the DatabaseWriter object, the only component of the server writing to the SQLite database.
+
+        Updates are queued in memory, keeping only the latest value per node and per channel, and flushed every
+        flush_interval seconds with executemany in a single transaction. The database runs in WAL mode, so the UI
+        reading it never blocks on writes.
+
+        :param database: The path of the SQLite database.
+        :param flush_interval: The coalescing window, in seconds.
+        :param synchronous: The value of the synchronous pragma. NORMAL is durable across application crashes in WAL mode.
+        :param shared_state: A SharedState the updates are also published to, once they are committed.
+        """
+        threading.Thread.__init__(self, daemon=True)
+        self.database = database
+        self.flush_interval = flush_interval
+        self.synchronous = synchronous
+        self.shared_state = shared_state
+        self.running = True
+        self.lock = threading.Lock()
+        self.pending = threading.Event()
+        self.node_channels: Dict[int, int] = {}
+        self.channel_quality: Dict[int, float] = {}
+        self.first_pending: float = 0.0
+
+        self.updates = 0
+        self.commits = 0
+        self.started: float = time.perf_counter()
+        self.write_latencies: deque = deque(maxlen=10000)
+        self.commit_latencies: deque = deque(maxlen=10000)
+
+    def update_node_channel(self, node_id: int, channel: int) -> None:
+        """
+        Queues an update of the node_channels table.
+
+        :param node_id: The node ID to update in the table.
+        :param channel: The channel value to set for the node.
+        """
+        with self.lock:
+            self.mark_pending()
+            self.node_channels[node_id] = channel
+            self.updates += 1
+
+    def store_channel_quality(self, channel_quality: Sequence[float], channels: Sequence[int]) -> None:
+        """
+        Queues an update of the channel_quality table.
+
+        :param channel_quality: A list of channel quality values.
+        :param channels: A list of channel indices corresponding to the quality values.
+        """
+        with self.lock:
+            self.mark_pending()
+            self.channel_quality.update(zip(channels, channel_quality))
+            self.updates += 1
+
+    def mark_pending(self) -> None:
+        """
+        Records the arrival time of the first update of the window. Must be called with the lock held.
+        """
+        if not self.node_channels and not self.channel_quality:
+            self.first_pending = time.perf_counter()
+            self.pending.set()
+
+    def pending_rows(self) -> int:
+        """
+        Returns the number of rows waiting for the next flush.
+        """
+        return len(self.node_channels) + len(self.channel_quality)
+
+    def run(self) -> None:
+        """
+        Flushes the queued updates once per coalescing window until stopped.
+        """
+        conn = sqlite3.connect(self.database)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(f'PRAGMA synchronous={self.synchronous}')
+        try:
+            while self.running:
+                self.pending.wait()
+                if self.running:
+                    time.sleep(self.flush_interval)
+                self.flush(conn)
+            self.flush(conn)
+        finally:
+            conn.close()
+
+    def flush(self, conn: sqlite3.Connection) -> None:
+        """
+        Writes the queued updates in a single transaction.
+
+        :param conn: The connection of the writer thread.
+        """
+        with self.lock:
+            node_channels, self.node_channels = self.node_channels, {}
+            channel_quality, self.channel_quality = self.channel_quality, {}
+            first_pending = self.first_pending
+            self.pending.clear()
+
+        if not node_channels and not channel_quality:
+            return
+
+        start = time.perf_counter()
+        try:
+            with conn:
+                conn.executemany("""
+                REPLACE INTO node_channels (node_id, channel)
+                VALUES (?, ?)
+                """, node_channels.items())
+                conn.executemany("""
+                REPLACE INTO channel_quality (channel, quality)
+                VALUES (?, ?)
+                """, channel_quality.items())
+        except sqlite3.Error:
+            logging.error("Database write error", exc_info=True)
+            return
+        end = time.perf_counter()
+
+        # Only committed rows are published, so that the UI never shows state the database did not store
+        if self.shared_state is not None:
+            self.shared_state.update(node_channels, channel_quality)
+
+        self.commits += 1
+        self.commit_latencies.append(end - start)
+        self.write_latencies.append(end - first_pending)
+
+        metrics = Metrics.get_instance()
+        metrics.increment("db.commits")
+        metrics.increment("db.rows", len(node_channels) + len(channel_quality))
+        metrics.observe("db.commit_latency", end - start)
+        metrics.observe("db.write_latency", end - first_pending)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the throughput and latency statistics of the writer.
+
+        :return: The number of updates and commits, commits per second and the p99 commit and write latencies in
+            seconds. The write latency spans from the first update of a window to its commit.
+        """
+        elapsed = time.perf_counter() - self.started
+        return {
+            'updates': self.updates,
+            'commits': self.commits,
+            'commits_per_sec': self.commits / elapsed if elapsed > 0 else 0.0,
+            'p99_commit_latency': percentile(list(self.commit_latencies), 99),
+            'p99_write_latency': percentile(list(self.write_latencies), 99),
+        }
+
+    def stop(self) -> None:
+        """
+        Flushes the pending updates and stops the DatabaseWriter thread.
+        """
+        self.running = False
+        self.pending.set()
+        self.join()
+        logging.info("Database writer stats: %s", self.stats())
+
+
+def percentile(values: List[float], q: float) -> float:
+    """
+    Computes a percentile with the nearest-rank method.
+
+    :param values: The sample.
+    :param q: The percentile, between 0 and 100.
+    :return: The percentile of the sample, 0.0 for an empty sample.
+    """
+    if not values:
+        return 0.0
+    values = sorted(values)
+    rank = max(0, math.ceil(q / 100 * len(values)) - 1)
+    return values[rank]
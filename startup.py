@@ -0,0 +1,47 @@
+"""
+Description: Timing of the startup phases of the UI, reported with --startup-profile.
+
+Author: Willian T. Lunardi
+Contact: wtlunar@gmail.com
+License: MIT License (https://opensource.org/licenses/MIT)
+
+Repository:
+"""
+
+import time
+from typing import Dict, Optional
+
+
+class StartupProfile:
+    def __init__(self, start: Optional[float] = None) -> None:
+        """
+        Records the time spent in each startup phase, each phase ending where the next one starts.
+
+        Args:
+            start (Optional[float]): The perf_counter time startup began at. Defaults to now.
+        """
+        self.start: float = time.perf_counter() if start is None else start
+        self.last: float = self.start
+        self.phases: Dict[str, float] = {}
+
+    def mark(self, phase: str) -> None:
+        """
+        Ends a phase.
+
+        Args:
+            phase (str): The name of the phase.
+        """
+        now: float = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - self.last
+        self.last = now
+
+    @property
+    def total(self) -> float:
+        return self.last - self.start
+
+    def report(self) -> str:
+        lines = [f"{'phase':>12} {'ms':>8} {'share':>6}"]
+        for phase, duration in self.phases.items():
+            lines.append(f"{phase:>12} {duration * 1e3:>8.1f} {duration / self.total if self.total else 0.0:>6.1%}")
+        lines.append(f"{'total':>12} {self.total * 1e3:>8.1f}")
+        return '\n'.join(lines)
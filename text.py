@@ -8,41 +8,175 @@ License: MIT License (https://opensource.org/licenses/MIT)
 Repository:
 """
 
-from util import *
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple, Union
+
+import pygame
+
+from animation import Fade
+from util import BlinkController, Vec2
+
+
+class TextCache:
+    __instance = None
+
+    def __init__(self, max_size: int = 512) -> None:
+        """
+        Least recently used cache of rendered text surfaces.
+
+        Args:
+            max_size (int): The number of surfaces kept for the plots and titles. The cache grows by the labels of the
+                mesh nodes, reserved by the topology view as nodes join, so that a frame drawing every node never
+                evicts labels it needs again on the next frame.
+        """
+        self.base_size: int = max_size
+        self.max_size: int = max_size
+        self.surfaces: OrderedDict = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+    @staticmethod
+    def get_instance() -> 'TextCache':
+        """
+        Returns a singleton instance of the rendered text cache.
+
+        Returns:
+            TextCache: The rendered text cache.
+        """
+        if TextCache.__instance is None:
+            TextCache.__instance = TextCache()
+        return TextCache.__instance
+
+    def get(self, text: str, font: pygame.font.Font, color: pygame.Color, orientation: str) -> pygame.Surface:
+        """
+        Returns the rendered and oriented surface of a text, rendering it only if it is not cached yet.
+
+        Args:
+            text (str): The text to render.
+            font (pygame.font.Font): The font to render the text with.
+            color (pygame.Color): The color of the text.
+            orientation (str): Either 'horizontal' or 'vertical'.
+
+        Returns:
+            pygame.Surface: The rendered text. It is shared, so it must not be modified.
+        """
+        key = (text, font, font.get_height(), tuple(color), orientation)
+        surface: Optional[pygame.Surface] = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+
+        self.misses += 1
+        surface = apply_orientation(font.render(text, True, color), orientation)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_size:
+            self.surfaces.popitem(last=False)
+            self.evictions += 1
+        return surface
+
+    def reserve(self, count: int) -> None:
+        """
+        Makes room for a number of surfaces on top of the base size. The cache never shrinks.
+
+        Args:
+            count (int): The number of surfaces, e.g. the labels of every node.
+        """
+        self.max_size = max(self.max_size, self.base_size + count)
+
+    def stats(self) -> dict:
+        return {'size': len(self.surfaces), 'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+
+def apply_orientation(rendered_text: pygame.Surface, orientation: str) -> pygame.Surface:
+    if orientation == 'horizontal':
+        return rendered_text
+    elif orientation == 'vertical':
+        return pygame.transform.rotate(rendered_text, 90)
+    else:
+        raise ValueError(f"Invalid orientation '{orientation}'. Supported values are 'horizontal' and 'vertical'.")
 
 
 class Text:
+    # Total time spent drawing text, for profiling
+    draw_time: float = 0.0
+
     def __init__(self, text: Union[str, int, float], position: Union[Vec2, Tuple[int, int]], font_size: int = 24, color: pygame.Color = pygame.Color("black"),
                  orientation: str = 'horizontal'):
         self.text: str = str(text)
         self.blinking_message: str = ''
         self.position: Vec2 = position if isinstance(position, Vec2) else Vec2(*position)
         self.blink_controller: BlinkController = BlinkController()
+        self.fade: Fade = Fade()
         self.font_size: int = font_size
         self.color: pygame.Color = color
         self.orientation: str = orientation
+        self.drawn_rect: Optional[pygame.Rect] = None
+        self.drawn_state: Optional[Tuple[str, bool, int]] = None
 
-    def draw(self, surface: pygame.Surface, font: pygame.font.Font) -> None:
+    def render(self, font: pygame.font.Font) -> Tuple[pygame.Surface, Tuple[float, float]]:
+        """
+        Returns the rendered text and where to blit it, e.g. to batch many texts in a single Surface.blits call.
+        """
         str_text: str = self.text if not self.blink_controller.blinking else self.blinking_message
-        rendered_text: pygame.Surface = font.render(str_text, True, self.color)
-        rotated_text: pygame.Surface = self._apply_orientation(rendered_text)
+        rotated_text: pygame.Surface = TextCache.get_instance().get(str_text, font, self.color, self.orientation)
         text_pos: Vec2 = self.position - Vec2(rotated_text.get_width() // 2, rotated_text.get_height() // 2)
+        return rotated_text, (text_pos.x, text_pos.y)
 
+    def draw(self, surface: pygame.Surface, font: pygame.font.Font) -> Optional[pygame.Rect]:
+        start: float = time.perf_counter()
+        rect: Optional[pygame.Rect] = None
         if self.blink_controller.text_on:
-            surface.blit(rotated_text, (text_pos.x, text_pos.y))
+            rendered_text, text_pos = self.render(font)
+            alpha: int = self.alpha
+            if alpha < 255:
+                # Cached surfaces are shared, the faded one is a copy
+                rendered_text = rendered_text.copy()
+                rendered_text.set_alpha(alpha)
+            rect = surface.blit(rendered_text, text_pos)
+        Text.draw_time += time.perf_counter() - start
+        return rect
+
+    def redraw(self, surface: pygame.Surface, background: pygame.Surface, font: pygame.font.Font, force: bool = False) -> List[pygame.Rect]:
+        """
+        Draws the text again if its content, blink state or fade changed since it was last drawn, after restoring the
+        background under it.
+
+        Args:
+            surface (pygame.Surface): The surface to draw on.
+            background (pygame.Surface): The static layer of the surface.
+            font (pygame.font.Font): The font to render the text with.
+            force (bool): Draw the text even if it did not change, after the whole surface was redrawn.
+
+        Returns:
+            List[pygame.Rect]: The rectangles of the surface that changed.
+        """
+        state: Tuple[str, bool, int] = (self.text if not self.blink_controller.blinking else self.blinking_message, self.blink_controller.text_on, self.alpha)
+        if not force and state == self.drawn_state:
+            return []
+
+        rects: List[pygame.Rect] = []
+        if self.drawn_rect is not None and not force:
+            surface.blit(background, self.drawn_rect, self.drawn_rect)
+            rects.append(self.drawn_rect)
+        self.drawn_rect = self.draw(surface, font)
+        self.drawn_state = state
+        if self.drawn_rect is not None:
+            rects.append(self.drawn_rect)
+        return rects
+
+    @property
+    def alpha(self) -> int:
+        # The blinking message is drawn opaque, the new text fades in once the blinking is over
+        return 255 if self.blink_controller.blinking else self.fade.alpha
 
     def update_text(self, new_text: str, blinking_message: str) -> None:
         self.text: str = new_text
         self.blinking_message: str = blinking_message
         self.blink()
+        self.fade.start(delay=self.blink_controller.remaining)
 
     def blink(self) -> None:
         self.blink_controller.start()
-
-    def _apply_orientation(self, rendered_text: pygame.Surface) -> pygame.Surface:
-        if self.orientation == 'horizontal':
-            return rendered_text
-        elif self.orientation == 'vertical':
-            return pygame.transform.rotate(rendered_text, 90)
-        else:
-            raise ValueError(f"Invalid orientation '{self.orientation}'. Supported values are 'horizontal' and 'vertical'.")
@@ -0,0 +1,133 @@
+"""
+Description: Topology view, laying out and drawing every mesh node reported in the database.
+
+Author: Willian T. Lunardi
+Contact: wtlunar@gmail.com
+License: MIT License (https://opensource.org/licenses/MIT)
+
+Repository:
+"""
+
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pygame
+
+from assets import Assets
+from node import Node
+from text import TextCache
+
+# Cells narrower than this show the node id and channel number only
+COMPACT_CELL_WIDTH: int = 200
+
+# Labels drawn per node, its name and its channel
+LABELS_PER_NODE: int = 2
+
+
+class TopologyView:
+    def __init__(self, area: pygame.Rect, font: pygame.font.Font, min_font_size: int = 8, max_spacing: Optional[int] = None) -> None:
+        """
+        Builds one Node per mesh node from the node_channels rows of the database and lays them out on a grid that
+        fills the given area, shrinking sprites and labels as the mesh grows.
+
+        Args:
+            area (pygame.Rect): The area of the screen the nodes are laid out in.
+            font (pygame.font.Font): The font of the labels when there is room for it.
+            min_font_size (int): The smallest label font size.
+            max_spacing (Optional[int]): The largest horizontal spacing between nodes in pixels, the grid is centered in
+                the area when it is narrower. Unbounded by default.
+        """
+        self.area: pygame.Rect = area
+        self.font: pygame.font.Font = font
+        self.label_font: pygame.font.Font = font
+        self.min_font_size: int = min_font_size
+        self.max_spacing: Optional[int] = max_spacing
+        self.fonts: Dict[int, pygame.font.Font] = {font.get_height(): font}
+        self.nodes: Dict[int, Node] = {}
+        self.scale: float = Assets.get_instance().scale
+        self.compact: bool = False
+
+    def apply(self, node_channels: Iterable[Tuple[int, int]]) -> bool:
+        """
+        Adds and removes nodes to match the rows of node_channels and moves the nodes whose channel changed.
+
+        Args:
+            node_channels (Iterable[Tuple[int, int]]): The (node id, channel) rows of the database.
+
+        Returns:
+            bool: Whether nodes were added or removed, in which case the static layer must be drawn again.
+        """
+        channels: Dict[int, int] = dict(node_channels)
+
+        changed: bool = channels.keys() != self.nodes.keys()
+        if changed:
+            self.nodes = {node_id: self.nodes.get(node_id) or Node(f'Node {node_id}', channels[node_id], (0, 0)) for node_id in sorted(channels)}
+            TextCache.get_instance().reserve(LABELS_PER_NODE * len(self.nodes))
+            self.layout()
+
+        for node_id, channel in channels.items():
+            node: Node = self.nodes[node_id]
+            if node.channel != channel:
+                node.change_channel(channel)
+        return changed
+
+    def layout(self) -> None:
+        """
+        Places the nodes on a grid with roughly square cells, one node per cell, at most max_spacing wide.
+        """
+        count: int = len(self.nodes)
+        if count == 0:
+            return
+        cols: int = max(1, min(count, math.ceil(math.sqrt(count * self.area.width / self.area.height))))
+        rows: int = math.ceil(count / cols)
+        cell_width: float = self.area.width / cols
+        if self.max_spacing:
+            cell_width = min(cell_width, self.max_spacing)
+        left: float = self.area.x + (self.area.width - cols * cell_width) / 2
+        cell_height: float = self.area.height / rows
+
+        # Fit the sprite and its two labels in the cell
+        assets: Assets = Assets.get_instance()
+        sprite_height: int = assets.load('node_green2').get_height()
+        self.scale = min(assets.scale, 0.6 * min(cell_width, cell_height) / sprite_height)
+        self.compact = cell_width < COMPACT_CELL_WIDTH
+        self.label_font = self.get_font(min(self.font.get_height(), max(self.min_font_size, int(cell_height * 0.2))))
+
+        for i, (node_id, node) in enumerate(self.nodes.items()):
+            row, col = divmod(i, cols)
+            position: Tuple[int, int] = (round(left + (col + 0.5) * cell_width), round(self.area.y + (row + 0.5) * cell_height))
+            node.compact = self.compact
+            node.name.text = str(node_id) if self.compact else f'Node {node_id}'
+            node.channel_text.text = node.channel_label(node.channel)
+            node.place(position, self.scale)
+
+    def get_font(self, size: int) -> pygame.font.Font:
+        font: pygame.font.Font = self.fonts.get(size)
+        if font is None:
+            font = pygame.font.SysFont(None, size)
+            self.fonts[size] = font
+        return font
+
+    def draw_static(self, surface: pygame.Surface) -> None:
+        """
+        Draws the shadows, sprites and names of all nodes in a single batch.
+        """
+        blits: List[Tuple[pygame.Surface, pygame.Rect]] = []
+        for node in self.nodes.values():
+            blits.append((node.shadow, node.rect))
+            blits.append((node.sprite, node.rect))
+        for node in self.nodes.values():
+            blits.append(node.name.render(self.label_font))
+        surface.blits(blits, doreturn=False)
+
+    def redraw(self, surface: pygame.Surface, background: pygame.Surface, force: bool = False) -> List[pygame.Rect]:
+        """
+        Draws the channel labels whose text or blink state changed.
+
+        Returns:
+            List[pygame.Rect]: The rectangles changed on the surface.
+        """
+        rects: List[pygame.Rect] = []
+        for node in self.nodes.values():
+            rects.extend(node.redraw(surface, background, self.label_font, force))
+        return rects
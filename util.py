@@ -8,15 +8,13 @@ License: MIT License (https://opensource.org/licenses/MIT)
 Repository:
 """
 
-import threading
-import time
 from enum import Enum
 from typing import Union, Tuple, Optional
 
 import numpy as np
 import pygame
-from scipy.ndimage.filters import gaussian_filter1d
 
+from animation import TimelineEffect
 from options import Options
 
 
@@ -50,35 +48,25 @@ class Vec2:
         return f"Vec2({self.x}, {self.y})"
 
 
-class BlinkController:
+class BlinkController(TimelineEffect):
     def __init__(self, times: int = 5, blink_interval: float = 0.5):
-        self.text_on: bool = True
-        self.blinking: bool = False
+        super().__init__((times * 2 + 1) * blink_interval)
         self.times: int = times
         self.blink_interval: float = blink_interval
-        self.last_blink: float = 0
 
-    def start(self) -> None:
-        if self.blinking:
-            return
-
-        def run() -> None:
-            counter: int = 0
-            while counter < self.times * 2 + 1:
-                self.blinking: bool = True
-                self.text_on: bool = not self.text_on
-                now: float = time.time()
-                self.last_blink: float = now
-                counter += 1
-                time.sleep(self.blink_interval)
-            self.stop()
+    @property
+    def blinking(self) -> bool:
+        return self.active
 
-        thread = threading.Thread(target=run)
-        thread.start()
+    @property
+    def text_on(self) -> bool:
+        # The text is hidden right away and then toggled every blink interval
+        return not self.blinking or int(self.elapsed / self.blink_interval) % 2 == 1
 
-    def stop(self) -> None:
-        self.text_on: bool = True
-        self.blinking: bool = False
+    def start(self, delay: float = 0.0) -> None:
+        if self.blinking:
+            return
+        super().start(delay)
 
 
 class Screen:
@@ -139,6 +127,9 @@ def quit_pygame() -> None:
 
 
 def generate_smooth_distribution(n_samples: int, index: int, noise: float = 0.05) -> np.ndarray:
+    # Imported here, SciPy takes longer to import than the rest of the UI and is only needed by this function
+    from scipy.ndimage import gaussian_filter1d
+
     # Initialize an array with n_samples zeros
     distribution = np.zeros(n_samples)
     # Set the minimum value around the specified index
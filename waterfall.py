@@ -0,0 +1,114 @@
+"""
+Description: Waterfall view of the channel quality over time, rendered as a scrolling heatmap.
+
+Author: Willian T. Lunardi
+Contact: wtlunar@gmail.com
+License: MIT License (https://opensource.org/licenses/MIT)
+
+Repository:
+"""
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pygame
+
+from text import Text
+
+# Colour of the cells of channels without estimation
+MISSING_COLOR: Tuple[int, int, int] = (235, 235, 235)
+
+
+def quality_colormap(size: int = 256) -> np.ndarray:
+    """
+    Builds a lookup table from quality to colour, red for jammed channels through white to green for clear ones, as
+    the bars of the plot. The extra last entry is the colour of missing estimations.
+
+    Args:
+        size (int): The number of quality levels.
+
+    Returns:
+        np.ndarray: A (size + 1) x 3 array of uint8 colours.
+    """
+    t: np.ndarray = np.linspace(0.0, 1.0, size)[:, None]
+    red: np.ndarray = np.array([228, 30, 38])
+    white: np.ndarray = np.array([255, 255, 255])
+    green: np.ndarray = np.array([46, 204, 113])
+    colors: np.ndarray = np.where(t < 0.5, red + (white - red) * (t * 2), white + (green - white) * (t * 2 - 1))
+    return np.vstack([colors, MISSING_COLOR]).astype(np.uint8)
+
+
+class Waterfall:
+    def __init__(self, rect: pygame.Rect, num_channels: int, row_height: int = 2, title: str = '',
+                 lut: Optional[np.ndarray] = None) -> None:
+        """
+        Scrolling heatmap with one column per channel and one row per estimation, the newest on top.
+
+        The heatmap is kept in its own surface. New estimations scroll it in place and only the new rows are written,
+        colour-mapped with a lookup table and expanded to pixels with NumPy in a single pass through surfarray.
+
+        Args:
+            rect (pygame.Rect): The area of the screen covered by the heatmap.
+            num_channels (int): The number of channels, the columns of the estimations.
+            row_height (int): The height of the rows in pixels.
+            title (str): The title drawn under the heatmap.
+            lut (Optional[np.ndarray]): The colormap, as returned by quality_colormap.
+        """
+        self.rect: pygame.Rect = rect
+        self.row_height: int = row_height
+        self.lut: np.ndarray = quality_colormap() if lut is None else lut
+        self.surface: pygame.Surface = pygame.Surface(rect.size, depth=24)
+        self.surface.fill(MISSING_COLOR)
+        self.title: Text = Text(title, (rect.centerx, rect.bottom + 25), orientation='horizontal')
+
+        # Channel column of every pixel column, so that widening a row to pixels is a single take
+        self.pixel_columns: np.ndarray = np.minimum(np.arange(rect.width) * num_channels // rect.width, num_channels - 1)
+        self.pending: List[np.ndarray] = []
+
+    def push(self, row: np.ndarray) -> None:
+        """
+        Queues an estimation, drawn on the next redraw.
+
+        Args:
+            row (np.ndarray): The quality per channel in [0, 1], NaN for channels without estimation.
+        """
+        self.pending.append(np.array(row, dtype=float))
+
+    def colorize(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Maps estimations to pixel rows.
+
+        Args:
+            rows (np.ndarray): The (rows x channels) estimations, oldest first.
+
+        Returns:
+            np.ndarray: The (width x rows * row_height x 3) pixels, newest row on top, in surfarray axis order.
+        """
+        levels: int = len(self.lut) - 1
+        indices: np.ndarray = np.where(np.isnan(rows), levels, np.clip(np.nan_to_num(rows) * (levels - 1), 0, levels - 1).astype(np.intp))
+        pixels: np.ndarray = self.lut[indices[::-1][:, self.pixel_columns]]
+        return np.repeat(pixels, self.row_height, axis=0).transpose(1, 0, 2)
+
+    def draw_static(self, surface: pygame.Surface, font: pygame.font.Font) -> None:
+        pygame.draw.rect(surface, (0, 0, 0), self.rect.inflate(2, 2), 1)
+        self.title.draw(surface, font)
+
+    def redraw(self, surface: pygame.Surface, force: bool = False) -> List[pygame.Rect]:
+        """
+        Scrolls the new estimations in and draws the heatmap if it changed.
+
+        Returns:
+            List[pygame.Rect]: The rectangles of the surface that changed.
+        """
+        if not self.pending and not force:
+            return []
+
+        if self.pending:
+            rows: np.ndarray = np.vstack(self.pending[-(self.rect.height // self.row_height):])
+            self.pending.clear()
+            pixels: np.ndarray = self.colorize(rows)
+            self.surface.scroll(0, pixels.shape[1])
+            pygame.surfarray.pixels3d(self.surface)[:, :pixels.shape[1]] = pixels
+
+        surface.blit(self.surface, self.rect)
+        return [self.rect]